@@ -0,0 +1,495 @@
+"""
+Vectorized momentum backtest engine
+
+Daily closes for the whole universe are loaded once into a date x symbol
+panel. Lookback returns, rankings and rebalance valuations are then
+computed with NumPy for every rebalance date at once, with no per-date
+data access. Grids of lookback and band variants are simulated together,
+one set of array operations per rebalance date for the whole grid.
+Daily mark-to-market NAV comes from the same panel, each day's prices
+weighted by the holdings in force on it.
+"""
+
+import calendar
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from candle_store import candle_store
+from config import MAX_CONCURRENT_REQUESTS
+from resample import IST_OFFSET_SECONDS
+
+# loader(instkey, start_date, end_date) -> daily columns (oldest first) or None
+CandleLoader = Callable[[str, str, str], Optional[Dict[str, np.ndarray]]]
+
+TRADING_DAYS_PER_YEAR = 252
+ROLLING_VOL_DAYS = 21  # Window of the rolling volatility of daily NAV returns
+
+
+def _store_loader(instkey: str, start_date: str, end_date: str) -> Optional[Dict[str, np.ndarray]]:
+    """Read daily candles from the local store only"""
+    return candle_store.read(instkey, 'day', start_date, end_date)
+
+
+def monthly_dates(start: date, end: date, months: int = 1) -> List[date]:
+    """
+    Rebalance dates every `months` months from start through end
+
+    Each date keeps start's day of the month, clamped to the month's last
+    day (so a 31st start falls on the 28th-30th in shorter months).
+    """
+    dates = []
+    k = 0
+    while True:
+        year, month = divmod(start.month - 1 + k, 12)
+        year += start.year
+        day = min(start.day, calendar.monthrange(year, month + 1)[1])
+        current = date(year, month + 1, day)
+        if current > end:
+            return dates
+        dates.append(current)
+        k += months
+
+
+def _to_days(days: Iterable[date]) -> np.ndarray:
+    """Dates as datetime64[D]"""
+    return np.array([np.datetime64(d, 'D') for d in days], dtype='datetime64[D]')
+
+
+class PricePanel:
+    """
+    Daily closes as a date x symbol matrix
+
+    Rows are every trading day on which any symbol has a bar (IST dates,
+    ascending); cells without a bar are NaN.
+    """
+
+    def __init__(self, dates: np.ndarray, symbols: List[str], instkeys: List[str], close: np.ndarray):
+        """
+        Initialize the panel
+
+        Args:
+            dates: Trading days (datetime64[D]), ascending
+            symbols: Column symbols
+            instkeys: Upstox instrument key of each column
+            close: Closing prices, shape (len(dates), len(symbols)), NaN where missing
+        """
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.instkeys = list(instkeys)
+        self.close = close
+        self._last_valid = None
+        self._next_valid = None
+        self._month_end = None
+
+    @classmethod
+    def from_columns(cls, symbols: List[str], instkeys: List[str],
+                     columns: List[Optional[Dict[str, np.ndarray]]]) -> 'PricePanel':
+        """
+        Build a panel from per-symbol daily candle columns
+
+        Args:
+            symbols: Column symbols
+            instkeys: Upstox instrument key of each symbol
+            columns: Daily columns for each symbol (None for no data)
+
+        Returns:
+            PricePanel over the union of all trading days
+        """
+        days = [((c['timestamp'] + IST_OFFSET_SECONDS) // 86400).astype('datetime64[D]')
+                if c is not None else np.empty(0, dtype='datetime64[D]') for c in columns]
+        dates = np.unique(np.concatenate(days)) if days else np.empty(0, dtype='datetime64[D]')
+
+        close = np.full((len(dates), len(symbols)), np.nan)
+        for j, (symbol_days, c) in enumerate(zip(days, columns)):
+            if len(symbol_days):
+                close[np.searchsorted(dates, symbol_days), j] = c['close']
+        return cls(dates, symbols, instkeys, close)
+
+    @classmethod
+    def load(cls, universe, start_date: str, end_date: str,
+             loader: Optional[CandleLoader] = None, max_workers: Optional[int] = None) -> 'PricePanel':
+        """
+        Load daily closes for a universe in one pass
+
+        Instruments are loaded concurrently, so a cold store costs about
+        one round-trip per max_workers instruments rather than one each.
+
+        Args:
+            universe: UniverseIndex (or any object with items() of symbol -> instkey)
+            start_date: First day (YYYY-MM-DD)
+            end_date: Last day (YYYY-MM-DD)
+            loader: Source of daily columns (default: local candle store only)
+            max_workers: Maximum concurrent loads (default: MAX_CONCURRENT_REQUESTS)
+
+        Returns:
+            PricePanel with one column per universe symbol, in universe order
+        """
+        loader = loader or _store_loader
+        symbols, instkeys = zip(*universe.items()) if len(universe) else ((), ())
+        with ThreadPoolExecutor(max_workers=max_workers or MAX_CONCURRENT_REQUESTS) as executor:
+            columns = list(executor.map(lambda instkey: loader(instkey, start_date, end_date), instkeys))
+        return cls.from_columns(list(symbols), list(instkeys), columns)
+
+    @property
+    def last_valid(self) -> np.ndarray:
+        """Row of the latest close at or before each row, per symbol (-1 if none)"""
+        if self._last_valid is None:
+            rows = np.where(np.isnan(self.close), -1, np.arange(len(self.dates))[:, None])
+            self._last_valid = np.maximum.accumulate(rows, axis=0) if len(rows) else rows
+        return self._last_valid
+
+    @property
+    def next_valid(self) -> np.ndarray:
+        """
+        Row of the earliest close at or after each row, per symbol (len(dates) if none)
+
+        Has one extra trailing row so that len(dates) can be looked up too.
+        """
+        if self._next_valid is None:
+            n = len(self.dates)
+            rows = np.where(np.isnan(self.close), n, np.arange(n)[:, None])
+            rows = np.vstack([rows, np.full((1, len(self.symbols)), n)])
+            self._next_valid = np.minimum.accumulate(rows[::-1], axis=0)[::-1]
+        return self._next_valid
+
+    @property
+    def month_end(self) -> np.ndarray:
+        """Last row in the same calendar month as each row"""
+        if self._month_end is None:
+            months = self.dates.astype('datetime64[M]')
+            ends = np.r_[np.flatnonzero(months[1:] != months[:-1]), len(months) - 1]
+            self._month_end = ends[np.searchsorted(ends, np.arange(len(months)))]
+        return self._month_end
+
+    def lookback_returns(self, end_dates: Iterable[date], weeks: int) -> np.ndarray:
+        """
+        Momentum returns over a lookback window ending at each date
+
+        Matches resampling each symbol's daily bars in the window to monthly
+        bars and comparing the last close with the first monthly close (the
+        last close of the window's first month).
+
+        Args:
+            end_dates: Window end dates
+            weeks: Lookback length in weeks
+
+        Returns:
+            Array of shape (len(end_dates), len(symbols)); NaN where a symbol
+            has no bars in the window
+        """
+        return self.lookback_return_grid(end_dates, [weeks])[0]
+
+    def lookback_return_grid(self, end_dates: Iterable[date], weeks: Iterable[int]) -> np.ndarray:
+        """
+        Momentum returns for several lookback lengths at once
+
+        Args:
+            end_dates: Window end dates
+            weeks: Lookback lengths in weeks
+
+        Returns:
+            Array of shape (len(weeks), len(end_dates), len(symbols)); see
+            lookback_returns
+        """
+        ends = _to_days(end_dates)
+        spans = (7 * np.asarray(list(weeks), dtype=int)).astype('timedelta64[D]')
+        lo = np.searchsorted(self.dates, ends[None, :] - spans[:, None], side='left')  # (weeks, dates)
+        hi = np.searchsorted(self.dates, ends, side='right')
+        cols = np.arange(len(self.symbols))
+
+        first = self.next_valid[lo]  # (weeks, dates, symbols)
+        present = first < hi[:, None]
+        if len(self.dates) == 0:
+            return np.full(present.shape, np.nan)
+
+        first_month_end = np.minimum(self.month_end[np.minimum(first, len(self.dates) - 1)], hi[:, None] - 1)
+        start_rows = self.last_valid[np.maximum(first_month_end, 0), cols]
+        end_rows = self.last_valid[np.maximum(hi - 1, 0)]
+
+        start = self.close[start_rows, cols]
+        end = self.close[end_rows, cols]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = (end - start) / start
+        return np.where(present, returns, np.nan)
+
+    def prices_at(self, days: Iterable[date], max_age_days: int = 7) -> np.ndarray:
+        """
+        Latest close on or before each day, no older than max_age_days
+
+        Returns:
+            Array of shape (len(days), len(symbols)); NaN where there is none
+        """
+        days = _to_days(days)
+        rows = np.searchsorted(self.dates, days, side='right') - 1
+        cols = np.arange(len(self.symbols))
+        if len(self.dates) == 0:
+            return np.full((len(days), len(cols)), np.nan)
+
+        latest = self.last_valid[np.maximum(rows, 0)]
+        fresh = (rows[:, None] >= 0) & (latest >= 0)
+        fresh &= self.dates[np.maximum(latest, 0)] >= (days - np.timedelta64(max_age_days, 'D'))[:, None]
+        return np.where(fresh, self.close[np.maximum(latest, 0), cols], np.nan)
+
+    def mark_to_market(self, rebalance_dates: Iterable[date], positions: np.ndarray,
+                       cash: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Daily net asset value of holdings that only change at rebalances
+
+        Holdings are valued at each symbol's last known close. Each day is
+        valued only against the holdings in force on it, so the work grows
+        with days x symbols rather than days x rebalances x symbols.
+
+        Args:
+            rebalance_dates: Rebalance dates, ascending
+            positions: Units per symbol after each rebalance, shape
+                (..., rebalances, symbols), e.g. MomentumRun.positions
+            cash: Cash after each rebalance, shape (..., rebalances)
+
+        Returns:
+            (days, nav): trading days from the first rebalance through the
+            end of the panel (datetime64[D]), and NAV of shape (..., days)
+        """
+        rebalances = _to_days(rebalance_dates)
+        first = np.searchsorted(self.dates, rebalances[0]) if len(rebalances) else len(self.dates)
+        days = self.dates[first:]
+        if len(days) == 0:
+            return days, np.empty(cash.shape[:-1] + (0,))
+
+        segment = np.searchsorted(rebalances, days, side='right') - 1  # Rebalance in force each day
+        latest = self.last_valid[first:]
+        close = np.where(latest >= 0, self.close[np.maximum(latest, 0), np.arange(len(self.symbols))], 0.0)
+
+        # (days, symbols) x (..., days, symbols) -> (..., days)
+        holdings = np.einsum('ds,...ds->...d', close, positions[..., segment, :])
+        return days, holdings + cash[..., segment]
+
+
+def rank_order(returns: np.ndarray) -> np.ndarray:
+    """
+    Symbol indices by descending return, per row
+
+    Ties keep column order and NaN sorts last, like a stable
+    sorted(..., reverse=True) over non-NaN values.
+    """
+    return np.argsort(-returns, axis=-1, kind='stable')
+
+
+class MomentumRun(NamedTuple):
+    """Result of simulate_momentum"""
+    values: np.ndarray  # Portfolio value recorded at each rebalance
+    cash: np.ndarray  # Cash left after each rebalance
+    top: np.ndarray  # (dates, top_n) symbol indices bought into at each rebalance
+    sells: np.ndarray  # Symbols sold at each rebalance
+    buys: np.ndarray  # Symbols bought at each rebalance
+    holds: np.ndarray  # Holdings kept that are still in the top_n
+    units: np.ndarray  # Units held per symbol after the last rebalance
+    positions: np.ndarray  # (dates, symbols) units held after each rebalance
+
+
+class MomentumGrid(NamedTuple):
+    """
+    Result of simulate_momentum_grid
+
+    Per-rebalance arrays have shape (lookbacks, bands, dates); units has
+    shape (lookbacks, bands, symbols) and positions (lookbacks, bands,
+    dates, symbols).
+    """
+    values: np.ndarray
+    cash: np.ndarray
+    sells: np.ndarray
+    buys: np.ndarray
+    holds: np.ndarray
+    units: np.ndarray
+    positions: np.ndarray
+    order: np.ndarray  # (lookbacks, dates, symbols) rank_order of each lookback's returns
+    top_n: np.ndarray  # Buy band of each band pair
+    hold_n: np.ndarray  # Hold band of each band pair
+
+    def run(self, lookback: int, band: int) -> MomentumRun:
+        """The MomentumRun of one lookback index and band pair index"""
+        return MomentumRun(
+            self.values[lookback, band], self.cash[lookback, band],
+            self.order[lookback, :, :self.top_n[band]], self.sells[lookback, band],
+            self.buys[lookback, band], self.holds[lookback, band], self.units[lookback, band],
+            self.positions[lookback, band]
+        )
+
+
+def simulate_momentum(returns: np.ndarray, prices: np.ndarray, initial_capital: float,
+                      top_n: int = 20, hold_n: int = 40) -> MomentumRun:
+    """
+    Simulate a buy-top-N / hold-while-in-top-M momentum strategy
+
+    At each rebalance, holdings that fell out of the top hold_n are sold
+    and top_n symbols not held are bought with an equal 1/top_n share of
+    the cash each. The recorded value is the NSEMomentumBacktester
+    valuation: holdings before the sells plus cash after them, so sale
+    proceeds count twice.
+
+    Symbols without a return are never ranked into either band. Symbols
+    without a price are not traded (a holding is kept, a buy skipped and
+    its share left in cash) and are valued at their last known price.
+
+    Args:
+        returns: Lookback returns, shape (dates, symbols); NaN where unknown
+        prices: Trade prices, shape (dates, symbols); NaN where unknown
+        initial_capital: Starting cash
+        top_n: Rank band symbols are bought from
+        hold_n: Rank band holdings are kept within
+
+    Returns:
+        MomentumRun with per-rebalance values
+    """
+    return simulate_momentum_grid(returns[None], prices, initial_capital, [(top_n, hold_n)]).run(0, 0)
+
+
+def simulate_momentum_grid(returns: np.ndarray, prices: np.ndarray, initial_capital: float,
+                           bands: Iterable[Tuple[int, int]]) -> MomentumGrid:
+    """
+    Simulate simulate_momentum for every lookback and band pair in one pass
+
+    Rank positions are computed once per lookback; each band pair is a
+    threshold on them, so the whole grid advances together with one set of
+    array operations per rebalance date.
+
+    Args:
+        returns: Lookback returns, shape (lookbacks, dates, symbols), e.g.
+            from PricePanel.lookback_return_grid
+        prices: Trade prices, shape (dates, symbols); NaN where unknown
+        initial_capital: Starting cash of every variant
+        bands: (top_n, hold_n) pairs
+
+    Returns:
+        MomentumGrid over lookbacks x band pairs
+    """
+    n_lookbacks, n_dates, n_symbols = returns.shape
+    bands = np.array(list(bands), dtype=int).reshape(-1, 2)
+    top_n, hold_n = bands[:, 0], bands[:, 1]
+    shape = (n_lookbacks, len(top_n))
+
+    order = rank_order(returns)
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.broadcast_to(np.arange(n_symbols), order.shape), axis=-1)
+    ranked = np.isfinite(returns)
+
+    units = np.zeros(shape + (n_symbols,))
+    held = np.zeros(shape + (n_symbols,), dtype=bool)
+    last_price = np.full(n_symbols, np.nan)
+    capital = np.full(shape, float(initial_capital))
+
+    values = np.empty(shape + (n_dates,))
+    cash = np.empty(shape + (n_dates,))
+    sells = np.empty(shape + (n_dates,), dtype=int)
+    buys = np.empty(shape + (n_dates,), dtype=int)
+    holds = np.empty(shape + (n_dates,), dtype=int)
+    positions = np.empty(shape + (n_dates, n_symbols))
+
+    for t in range(n_dates):
+        # (lookbacks, 1, symbols) against (bands, 1) -> (lookbacks, bands, symbols)
+        rank_t = rank[:, None, t]
+        ranked_t = ranked[:, None, t]
+        in_top = (rank_t < top_n[:, None]) & ranked_t
+        in_hold = (rank_t < hold_n[:, None]) & ranked_t
+
+        price = prices[t]
+        tradable = np.isfinite(price)
+        last_price[tradable] = price[tradable]
+        sell = held & ~in_hold & tradable
+        buy = in_top & ~held & tradable
+
+        holdings_value = np.where(held, units * last_price, 0.0).sum(axis=-1)
+        capital += np.where(sell, units * price, 0.0).sum(axis=-1)
+        values[..., t] = holdings_value + capital
+
+        units[sell] = 0.0
+        held &= ~sell
+        n_top = in_top.sum(axis=-1)
+        n_buy = buy.sum(axis=-1)
+        per_symbol = np.divide(capital, n_top, out=np.zeros(shape), where=n_buy > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            units = np.where(buy, per_symbol[..., None] / price, units)
+        held |= buy
+        capital -= per_symbol * n_buy
+
+        cash[..., t] = capital
+        positions[..., t, :] = units
+        sells[..., t], buys[..., t] = sell.sum(axis=-1), n_buy
+        holds[..., t] = (held & in_top & ~buy).sum(axis=-1)
+
+    return MomentumGrid(values, cash, sells, buys, holds, units, positions, order, top_n, hold_n)
+
+
+def run_metrics(values: np.ndarray, dates: List[date], initial_capital: float,
+                periods_per_year: float = 12) -> Dict[str, float]:
+    """
+    Performance metrics of a value series recorded at rebalance dates
+
+    Args:
+        values: Portfolio value at each date
+        dates: The dates (first to last gives the elapsed time)
+        initial_capital: Starting capital
+        periods_per_year: Rebalances per year, to annualize volatility
+
+    Returns:
+        Dict with final_value, total_return, annualized_return, volatility,
+        sharpe and max_drawdown (NaN where there is too little data)
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return dict.fromkeys(('final_value', 'total_return', 'annualized_return',
+                              'volatility', 'sharpe', 'max_drawdown'), np.nan)
+
+    final_value = values[-1]
+    years = (dates[-1] - dates[0]).days / 365.25
+    annualized = (final_value / initial_capital) ** (1 / years) - 1 if years > 0 else np.nan
+
+    period_returns = np.diff(values) / values[:-1]
+    volatility = np.std(period_returns) * np.sqrt(periods_per_year) if len(period_returns) else np.nan
+    sharpe = annualized / volatility if volatility > 0 else 0.0
+
+    return {
+        'final_value': final_value,
+        'total_return': (final_value - initial_capital) / initial_capital,
+        'annualized_return': annualized,
+        'volatility': volatility,
+        'sharpe': sharpe,
+        'max_drawdown': float(np.min(values / np.maximum.accumulate(values) - 1)),
+    }
+
+
+def nav_metrics(nav: np.ndarray, window: int = ROLLING_VOL_DAYS,
+                periods_per_year: float = TRADING_DAYS_PER_YEAR) -> Dict[str, object]:
+    """
+    Risk metrics of a daily NAV series
+
+    Args:
+        nav: Net asset value on each trading day
+        window: Days in the rolling volatility window
+        periods_per_year: Trading days per year, to annualize
+
+    Returns:
+        Dict with volatility (annualized), sharpe (mean over standard
+        deviation of daily returns, annualized, zero risk-free rate),
+        max_drawdown, and per-day arrays drawdown and rolling_volatility
+        (NaN until a full window of returns is available)
+    """
+    nav = np.asarray(nav, dtype=float)
+    daily = np.diff(nav) / nav[:-1] if len(nav) > 1 else np.empty(0)
+    std = np.std(daily) if len(daily) else np.nan
+
+    rolling = np.full(len(nav), np.nan)
+    if len(daily) >= window:
+        rolling[window:] = sliding_window_view(daily, window).std(axis=-1) * np.sqrt(periods_per_year)
+    drawdown = nav / np.maximum.accumulate(nav) - 1 if len(nav) else np.empty(0)
+
+    return {
+        'volatility': std * np.sqrt(periods_per_year),
+        'sharpe': np.mean(daily) / std * np.sqrt(periods_per_year) if std > 0 else 0.0,
+        'max_drawdown': float(np.min(drawdown)) if len(nav) else np.nan,
+        'drawdown': drawdown,
+        'rolling_volatility': rolling,
+    }
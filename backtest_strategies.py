@@ -2,35 +2,29 @@
 """
 NSE 200 Momentum Strategy Backtester
 Simulates 6-month and 12-month momentum strategies over the past year with monthly rebalancing
+
+Daily closes for the whole universe are loaded once into a price panel
+(see backtest_engine.py); returns, rankings and valuations are computed
+from it in NumPy. Candles come through market_data, so they share the
+local candle store, the API cache and its retry/rate-limit handling with
+the live algorithm.
 """
 
-import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-import requests
-import os
-from dotenv import load_dotenv
-import matplotlib.pyplot as plt
+from datetime import date, timedelta
 import warnings
+from backtest_engine import (
+    ROLLING_VOL_DAYS, PricePanel, monthly_dates, nav_metrics, run_metrics, simulate_momentum_grid
+)
+from market_data import get_candles
+from universe import load_universe
 warnings.filterwarnings('ignore')
 
-load_dotenv()
-
 class NSEMomentumBacktester:
     def __init__(self):
-        self.api_token = os.getenv('UPSTOX_API_TOKEN')
-        if not self.api_token:
-            raise ValueError("UPSTOX_API_TOKEN environment variable is not set")
-        
-        self.headers = {
-            "Api-Version": "2.0",
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.api_token}",
-        }
-        
         # Load NSE 200 list
-        self.nse200_df = pd.read_excel('ind_nifty200list.xlsx')
-        print(f"Loaded {len(self.nse200_df)} NSE 200 stocks")
+        self.universe = load_universe('ind_nifty200list.xlsx')
+        print(f"Loaded {len(self.universe)} NSE 200 stocks")
         
         # Initialize portfolios
         self.portfolio_6m = {}  # symbol: units
@@ -40,198 +34,103 @@ class NSEMomentumBacktester:
         self.performance_6m = []
         self.performance_12m = []
         self.rebalance_dates = []
+        self.nav_6m = []  # Daily mark-to-market NAV
+        self.nav_12m = []
+        self.nav_dates = []
         
         # Initial capital
         self.initial_capital = 1000000  # 10 lakh
         self.capital_6m = self.initial_capital
         self.capital_12m = self.initial_capital
-
-    def datesort(self, crow):
-        dt = crow[0]
-        return int(datetime.fromisoformat(dt).timestamp())
-
-    def get_historical_returns(self, instkey, weeks_back, end_date):
-        """Get returns for a stock over specified weeks looking back from end_date"""
-        ed = end_date.strftime('%Y-%m-%d')
-        sd = (end_date - timedelta(weeks=weeks_back)).strftime('%Y-%m-%d')
-        url = f"https://api-v2.upstox.com/historical-candle/{instkey}/month/{ed}/{sd}"
         
-        try:
-            resp = requests.get(url, headers=self.headers)
-            if resp.status_code != 200:
-                print(f"API error for {instkey}: {resp.status_code}")
-                return 0
-                
-            rjson = resp.json()
-            if rjson["status"] != "success":
-                print(f"API status error for {instkey}: {rjson['status']}")
-                return 0
-            
-            candles = rjson["data"]["candles"]
-            if not candles:
-                return 0
-                
-            candles.sort(key=self.datesort, reverse=True)
-            
-            start_price = candles[-1][4]
-            end_price = candles[0][4]
-            return (end_price - start_price) / start_price
-            
-        except Exception as e:
-            print(f"Error fetching data for {instkey}: {e}")
-            return 0
+        self.strategies = {'6m': 26, '12m': 52}  # strategy: lookback weeks
+        self.top_n = 20
+        self.hold_n = 40
+        self.panel = None
 
-    def get_current_price(self, instkey, date_):
-        """Get current price for a stock at a specific date"""
-        ed = date_.strftime('%Y-%m-%d')
-        sd = (date_ - timedelta(days=7)).strftime('%Y-%m-%d')
-        url = f"https://api-v2.upstox.com/historical-candle/{instkey}/day/{ed}/{sd}"
-        
-        try:
-            resp = requests.get(url, headers=self.headers)
-            if resp.status_code != 200:
-                return 100  # Default price
-                
-            rjson = resp.json()
-            if rjson["status"] != "success":
-                return 100
-            
-            candles = rjson["data"]["candles"]
-            if not candles:
-                return 100
-                
-            return candles[0][4]  # Latest close price
-            
-        except Exception as e:
-            return 100
-
-    def get_top_stocks(self, weeks_back, end_date, top_n=20):
-        """Get top N stocks based on returns over specified weeks"""
-        print(f"Calculating {weeks_back}-week returns as of {end_date.strftime('%Y-%m-%d')}")
-        
-        sym_returns = {}
-        for _, row in self.nse200_df.iterrows():
-            symbol = row['Symbol']
-            instkey = row['instrument_key']
-            returns = self.get_historical_returns(instkey, weeks_back, end_date)
-            sym_returns[symbol] = {
-                'returns': returns,
-                'instkey': instkey
-            }
-        
-        # Sort by returns
-        sorted_stocks = sorted(sym_returns.items(), key=lambda x: x[1]['returns'], reverse=True)
-        
-        top_stocks = sorted_stocks[:top_n]
-        top_40 = sorted_stocks[:40]
-        
-        print(f"Top {top_n} stocks by {weeks_back}-week returns:")
-        for i, (symbol, data) in enumerate(top_stocks[:10]):
-            print(f"  {i+1}. {symbol}: {data['returns']:.2%}")
-        
-        return top_stocks, top_40
+    def _load_candles(self, instkey, interval, sd, ed, report_errors=True):
+        """
+        Load candles through the shared market-data layer
+        
+        Stored bars answer the range when they can; otherwise the missing
+        tail is fetched through the API cache (keyed by the range's end
+        date, so windows that closed in the past are reused forever) with
+        rate limiting and retries.
+        """
+        return get_candles(instkey, interval, sd, ed, report_errors=report_errors)
 
-    def rebalance_portfolio(self, strategy, top_20, top_40, current_date):
-        """Rebalance portfolio based on strategy"""
-        if strategy == '6m':
-            portfolio = self.portfolio_6m
-            capital_attr = 'capital_6m'
-        else:
-            portfolio = self.portfolio_12m
-            capital_attr = 'capital_12m'
-        
-        current_capital = getattr(self, capital_attr)
-        
-        # Get current holdings
-        current_holdings = set(portfolio.keys())
-        top_20_symbols = {stock[0] for stock in top_20}
-        top_40_symbols = {stock[0] for stock in top_40}
-        
-        # Determine actions
-        sell_stocks = current_holdings - top_40_symbols
-        buy_stocks = top_20_symbols - current_holdings
-        hold_stocks = current_holdings & top_40_symbols & top_20_symbols
-        
-        print(f"\n{strategy.upper()} Strategy Rebalancing on {current_date.strftime('%Y-%m-%d')}:")
-        print(f"  Sell: {len(sell_stocks)} stocks")
-        print(f"  Buy: {len(buy_stocks)} stocks") 
-        print(f"  Hold: {len(hold_stocks)} stocks")
-        
-        # Calculate portfolio value before rebalancing
-        portfolio_value = 0
-        for symbol in list(portfolio.keys()):
-            if symbol in sell_stocks:
-                # Get instkey for selling stock
-                instkey = self.nse200_df[self.nse200_df['Symbol'] == symbol]['instrument_key'].iloc[0]
-                price = self.get_current_price(instkey, current_date)
-                units = portfolio[symbol]
-                stock_value = units * price
-                portfolio_value += stock_value
-                current_capital += stock_value
-                del portfolio[symbol]
-            else:
-                instkey = self.nse200_df[self.nse200_df['Symbol'] == symbol]['instrument_key'].iloc[0]
-                price = self.get_current_price(instkey, current_date)
-                units = portfolio[symbol]
-                portfolio_value += units * price
-        
-        # Add remaining cash
-        portfolio_value += current_capital
-        
-        # Buy new stocks - equal weight allocation
-        if buy_stocks:
-            capital_per_stock = current_capital / len(top_20_symbols)
-            
-            for symbol in buy_stocks:
-                instkey = self.nse200_df[self.nse200_df['Symbol'] == symbol]['instrument_key'].iloc[0]
-                price = self.get_current_price(instkey, current_date)
-                units = capital_per_stock / price
-                portfolio[symbol] = units
-                current_capital -= capital_per_stock
-        
-        setattr(self, capital_attr, current_capital)
-        
-        print(f"  Portfolio value: Rs.{portfolio_value:,.2f}")
-        print(f"  Cash remaining: Rs.{current_capital:,.2f}")
+    def load_price_panel(self, start_date, end_date):
+        """Load daily closes for the whole universe, fetching only what the store lacks"""
+        sd = start_date.strftime('%Y-%m-%d')
+        ed = end_date.strftime('%Y-%m-%d')
+        print(f"Loading daily closes for {len(self.universe)} stocks ({sd} to {ed})...")
         
-        return portfolio_value
+        self.panel = PricePanel.load(
+            self.universe, sd, ed,
+            loader=lambda instkey, s, e: self._load_candles(instkey, 'day', s, e)
+        )
+        return self.panel
 
-    def run_backtest(self):
-        """Run the backtest simulation"""
+    def run_backtest(self, end_date=None):
+        """
+        Run the backtest simulation
+        
+        Args:
+            end_date: Last rebalance date (default: today). With a past date
+                every window is closed, so reruns are answered from the
+                candle store and API cache without network calls.
+        """
         print("Starting NSE 200 Momentum Strategy Backtest")
         print("=" * 50)
         
         # Generate monthly rebalance dates for the past year
-        end_date = date.today()
+        end_date = end_date or date.today()
         start_date = end_date - timedelta(days=365)
+        self.rebalance_dates = monthly_dates(start_date, end_date)
+        
+        panel = self.load_price_panel(start_date - timedelta(weeks=max(self.strategies.values())), end_date)
+        no_data = [symbol for j, symbol in enumerate(panel.symbols) if np.isnan(panel.close[:, j]).all()]
+        if no_data:
+            print(f"No price data for {len(no_data)} stocks (not ranked or traded): {', '.join(no_data)}")
+        
+        # Stocks without a return are not ranked; without a price, not traded
+        # Both strategies are simulated together as one lookback grid
+        prices = panel.prices_at(self.rebalance_dates)
+        returns = panel.lookback_return_grid(self.rebalance_dates, self.strategies.values())
+        grid = simulate_momentum_grid(returns, prices, self.initial_capital, [(self.top_n, self.hold_n)])
+        runs = {
+            strategy: (weeks, returns[l], grid.run(l, 0))
+            for l, (strategy, weeks) in enumerate(self.strategies.items())
+        }
         
-        current_date = start_date
-        month_count = 0
-        
-        while current_date <= end_date:
-            month_count += 1
-            self.rebalance_dates.append(current_date)
-            
-            print(f"\nMonth {month_count}: {current_date.strftime('%Y-%m-%d')}")
+        for t, current_date in enumerate(self.rebalance_dates):
+            print(f"\nMonth {t + 1}: {current_date.strftime('%Y-%m-%d')}")
             print("-" * 30)
-            
-            # Get top stocks for both strategies
-            top_20_6m, top_40_6m = self.get_top_stocks(26, current_date, 20)
-            top_20_12m, top_40_12m = self.get_top_stocks(52, current_date, 20)
-            
-            # Rebalance portfolios
-            portfolio_value_6m = self.rebalance_portfolio('6m', top_20_6m, top_40_6m, current_date)
-            portfolio_value_12m = self.rebalance_portfolio('12m', top_20_12m, top_40_12m, current_date)
-            
-            # Record performance
-            self.performance_6m.append(portfolio_value_6m)
-            self.performance_12m.append(portfolio_value_12m)
-            
-            # Move to next month
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1)
+            for strategy, (weeks, returns, run) in runs.items():
+                print(f"Top {self.top_n} stocks by {weeks}-week returns as of {current_date.strftime('%Y-%m-%d')}:")
+                for i, j in enumerate(run.top[t, :10]):
+                    if np.isfinite(returns[t, j]):
+                        print(f"  {i+1}. {panel.symbols[j]}: {returns[t, j]:.2%}")
+            for strategy, (weeks, returns, run) in runs.items():
+                print(f"\n{strategy.upper()} Strategy Rebalancing on {current_date.strftime('%Y-%m-%d')}:")
+                print(f"  Sell: {run.sells[t]} stocks")
+                print(f"  Buy: {run.buys[t]} stocks")
+                print(f"  Hold: {run.holds[t]} stocks")
+                print(f"  Portfolio value: Rs.{run.values[t]:,.2f}")
+                print(f"  Cash remaining: Rs.{run.cash[t]:,.2f}")
+        
+        # Record performance
+        for strategy, (weeks, returns, run) in runs.items():
+            held = {panel.symbols[j]: run.units[j] for j in np.flatnonzero(run.units)}
+            setattr(self, f'portfolio_{strategy}', held)
+            setattr(self, f'capital_{strategy}', run.cash[-1] if len(run.cash) else self.initial_capital)
+            setattr(self, f'performance_{strategy}', list(run.values))
+        
+        # Daily NAV of every strategy from the panel, with no further data access
+        days, nav = panel.mark_to_market(self.rebalance_dates, grid.positions, grid.cash)
+        self.nav_dates = list(days.astype(object))
+        for l, strategy in enumerate(self.strategies):
+            setattr(self, f'nav_{strategy}', nav[l, 0])
         
         self.analyze_results()
 
@@ -241,20 +140,12 @@ class NSEMomentumBacktester:
         print("BACKTEST RESULTS SUMMARY")
         print("=" * 60)
         
-        # Calculate returns
+        # Calculate returns, volatility and Sharpe from the monthly values
         initial_value = self.initial_capital
-        final_value_6m = self.performance_6m[-1]
-        final_value_12m = self.performance_12m[-1]
-        
-        total_return_6m = (final_value_6m - initial_value) / initial_value
-        total_return_12m = (final_value_12m - initial_value) / initial_value
+        metrics_6m = run_metrics(self.performance_6m, self.rebalance_dates, initial_value)
+        metrics_12m = run_metrics(self.performance_12m, self.rebalance_dates, initial_value)
         
-        # Annualized returns
-        days_elapsed = (self.rebalance_dates[-1] - self.rebalance_dates[0]).days
-        years_elapsed = days_elapsed / 365.25
-        
-        annualized_return_6m = (final_value_6m / initial_value) ** (1 / years_elapsed) - 1
-        annualized_return_12m = (final_value_12m / initial_value) ** (1 / years_elapsed) - 1
+        years_elapsed = (self.rebalance_dates[-1] - self.rebalance_dates[0]).days / 365.25
         
         print(f"Initial Capital: Rs.{initial_value:,.2f}")
         print(f"Period: {self.rebalance_dates[0]} to {self.rebalance_dates[-1]}")
@@ -262,45 +153,52 @@ class NSEMomentumBacktester:
         print()
         
         print("6-MONTH MOMENTUM STRATEGY:")
-        print(f"  Final Value: Rs.{final_value_6m:,.2f}")
-        print(f"  Total Return: {total_return_6m:.2%}")
-        print(f"  Annualized Return: {annualized_return_6m:.2%}")
+        print(f"  Final Value: Rs.{metrics_6m['final_value']:,.2f}")
+        print(f"  Total Return: {metrics_6m['total_return']:.2%}")
+        print(f"  Annualized Return: {metrics_6m['annualized_return']:.2%}")
         print()
         
         print("12-MONTH MOMENTUM STRATEGY:")
-        print(f"  Final Value: Rs.{final_value_12m:,.2f}")
-        print(f"  Total Return: {total_return_12m:.2%}")
-        print(f"  Annualized Return: {annualized_return_12m:.2%}")
+        print(f"  Final Value: Rs.{metrics_12m['final_value']:,.2f}")
+        print(f"  Total Return: {metrics_12m['total_return']:.2%}")
+        print(f"  Annualized Return: {metrics_12m['annualized_return']:.2%}")
         print()
         
-        # Monthly returns
-        monthly_returns_6m = []
-        monthly_returns_12m = []
-        
-        for i in range(1, len(self.performance_6m)):
-            monthly_ret_6m = (self.performance_6m[i] - self.performance_6m[i-1]) / self.performance_6m[i-1]
-            monthly_ret_12m = (self.performance_12m[i] - self.performance_12m[i-1]) / self.performance_12m[i-1]
-            monthly_returns_6m.append(monthly_ret_6m)
-            monthly_returns_12m.append(monthly_ret_12m)
-        
-        if monthly_returns_6m:
-            volatility_6m = np.std(monthly_returns_6m) * np.sqrt(12)
-            volatility_12m = np.std(monthly_returns_12m) * np.sqrt(12)
-            
-            sharpe_6m = annualized_return_6m / volatility_6m if volatility_6m > 0 else 0
-            sharpe_12m = annualized_return_12m / volatility_12m if volatility_12m > 0 else 0
-            
+        if len(self.performance_6m) > 1:
             print("RISK METRICS:")
-            print(f"  6M Volatility: {volatility_6m:.2%}")
-            print(f"  12M Volatility: {volatility_12m:.2%}")
-            print(f"  6M Sharpe Ratio: {sharpe_6m:.2f}")
-            print(f"  12M Sharpe Ratio: {sharpe_12m:.2f}")
+            print(f"  6M Volatility: {metrics_6m['volatility']:.2%}")
+            print(f"  12M Volatility: {metrics_12m['volatility']:.2%}")
+            print(f"  6M Sharpe Ratio: {metrics_6m['sharpe']:.2f}")
+            print(f"  12M Sharpe Ratio: {metrics_12m['sharpe']:.2f}")
+        
+        # Daily NAV is marked to market, so sale proceeds are not double-counted
+        # as in the rebalance values above and intra-month drawdowns show up
+        if len(self.nav_dates) > 1:
+            daily_6m = nav_metrics(self.nav_6m)
+            daily_12m = nav_metrics(self.nav_12m)
+            print()
+            print(f"DAILY RISK METRICS ({len(self.nav_dates)} trading days, mark-to-market NAV):")
+            print(f"  6M Final NAV: Rs.{self.nav_6m[-1]:,.2f}")
+            print(f"  12M Final NAV: Rs.{self.nav_12m[-1]:,.2f}")
+            print(f"  6M Max Drawdown: {daily_6m['max_drawdown']:.2%}")
+            print(f"  12M Max Drawdown: {daily_12m['max_drawdown']:.2%}")
+            print(f"  6M Volatility: {daily_6m['volatility']:.2%}")
+            print(f"  12M Volatility: {daily_12m['volatility']:.2%}")
+            print(f"  6M Sharpe Ratio: {daily_6m['sharpe']:.2f}")
+            print(f"  12M Sharpe Ratio: {daily_12m['sharpe']:.2f}")
+            if len(self.nav_dates) > ROLLING_VOL_DAYS:
+                for label, daily in (('6M', daily_6m), ('12M', daily_12m)):
+                    rolling = daily['rolling_volatility']
+                    print(f"  {label} {ROLLING_VOL_DAYS}-Day Volatility: latest {rolling[-1]:.2%}, "
+                          f"peak {np.nanmax(rolling):.2%}")
         
         # Create performance chart
         self.plot_performance()
 
     def plot_performance(self):
         """Plot performance comparison"""
+        import matplotlib.pyplot as plt
+        
         plt.figure(figsize=(12, 8))
         
         # Convert to returns
@@ -326,9 +224,19 @@ class NSEMomentumBacktester:
 
 def main():
     """Main function to run the backtest"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="NSE 200 Momentum Strategy Backtester")
+    parser.add_argument(
+        '--end-date',
+        type=date.fromisoformat,
+        help='Last rebalance date, YYYY-MM-DD (default: today). Past dates rerun without network calls'
+    )
+    args = parser.parse_args()
+    
     try:
         backtester = NSEMomentumBacktester()
-        backtester.run_backtest()
+        backtester.run_backtest(args.end_date)
     except Exception as e:
         print(f"Error running backtest: {e}")
         print("Make sure you have:")
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Parallel parameter sweep over momentum backtest variants
+
+Every combination of lookback, buy band (TOP_20_COUNT), hold band
+(TOP_40_COUNT), rebalance frequency and start date is backtested on a
+process pool. The price panel is loaded once and placed in shared memory;
+workers map it instead of receiving a copy. Each worker task simulates a
+whole lookback x band grid at once (simulate_momentum_grid). Results are
+collected into one table with a row per variant.
+
+Usage:
+    python backtest_sweep.py --lookbacks 13,26,39,52 --top 10,20,30 --hold 20,40,60
+"""
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from multiprocessing import shared_memory
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from backtest_engine import PricePanel, monthly_dates, nav_metrics, run_metrics, simulate_momentum_grid
+from config import TOP_20_COUNT, TOP_40_COUNT, WEEKS_12M, WEEKS_6M
+
+SWEEP_WORKERS = int(os.getenv('SWEEP_WORKERS', os.cpu_count() or 1))
+
+
+class SweepVariant(NamedTuple):
+    """One backtest configuration"""
+    lookback_weeks: int
+    top_n: int  # Buy band (TOP_20_COUNT)
+    hold_n: int  # Hold band (TOP_40_COUNT)
+    rebalance_months: int
+    start_date: date
+
+
+def sweep_grid(lookbacks: Iterable[int], top_ns: Iterable[int], hold_ns: Iterable[int],
+               rebalance_months: Iterable[int], start_dates: Iterable[date]) -> List[SweepVariant]:
+    """
+    Every combination of the given values, skipping hold bands narrower than the buy band
+
+    Variants are ordered by start date, rebalance frequency, lookback and
+    bands, which is also the order run_sweep reports them in.
+    """
+    variants = [
+        SweepVariant(weeks, top_n, hold_n, months, start)
+        for start, months, weeks, top_n, hold_n in itertools.product(
+            sorted(set(start_dates)), sorted(set(rebalance_months)), sorted(set(lookbacks)),
+            sorted(set(top_ns)), sorted(set(hold_ns)))
+        if hold_n >= top_n
+    ]
+    return variants
+
+
+def _share_panel(panel: PricePanel) -> Tuple[shared_memory.SharedMemory, Tuple]:
+    """Copy a panel's closes into shared memory; returns the block and what workers need to map it"""
+    shm = shared_memory.SharedMemory(create=True, size=max(panel.close.nbytes, 1))
+    np.ndarray(panel.close.shape, dtype=panel.close.dtype, buffer=shm.buf)[:] = panel.close
+    spec = (shm.name, panel.close.shape, panel.dates, panel.symbols, panel.instkeys)
+    return shm, spec
+
+
+# Worker state, set once per process by _init_worker
+_panel: Optional[PricePanel] = None
+_shm: Optional[shared_memory.SharedMemory] = None
+_end_date: Optional[date] = None
+_initial_capital = 0.0
+
+
+class _SweepTask(NamedTuple):
+    """Variants simulated together: one rebalance schedule, lookbacks x band pairs"""
+    start_date: date
+    rebalance_months: int
+    lookbacks: Tuple[int, ...]
+    bands: Tuple[Tuple[int, int], ...]
+    variants: FrozenSet[SweepVariant]  # Which grid cells were asked for
+
+
+def _sweep_tasks(variants: List[SweepVariant], workers: int) -> List[_SweepTask]:
+    """
+    Group variants by rebalance schedule into grid simulations
+
+    A schedule's lookbacks are split into chunks so there are at least as
+    many tasks as workers.
+    """
+    groups = {}
+    for v in variants:
+        groups.setdefault((v.start_date, v.rebalance_months), []).append(v)
+
+    tasks = []
+    for (start_date, months), group in groups.items():
+        lookbacks = sorted({v.lookback_weeks for v in group})
+        bands = tuple(sorted({(v.top_n, v.hold_n) for v in group}))
+        chunks = min(len(lookbacks), -(-workers // len(groups)))
+        for chunk in np.array_split(np.array(lookbacks), chunks):
+            weeks = tuple(int(w) for w in chunk)
+            tasks.append(_SweepTask(start_date, months, weeks, bands,
+                                    frozenset(v for v in group if v.lookback_weeks in weeks)))
+    return tasks
+
+
+def _init_worker(spec: Tuple, end_date: date, initial_capital: float) -> None:
+    """Map the shared panel into this worker"""
+    global _panel, _shm, _end_date, _initial_capital
+    name, shape, dates, symbols, instkeys = spec
+    _shm = shared_memory.SharedMemory(name=name)
+    close = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+    _panel = PricePanel(dates, symbols, instkeys, close)
+    _end_date = end_date
+    _initial_capital = initial_capital
+
+
+def _run_task(task: _SweepTask) -> List[Dict]:
+    """Backtest one task's variants as a single grid on the worker's panel"""
+    dates = monthly_dates(task.start_date, _end_date, task.rebalance_months)
+    grid = None
+    if dates:
+        returns = _panel.lookback_return_grid(dates, task.lookbacks)
+        grid = simulate_momentum_grid(returns, _panel.prices_at(dates), _initial_capital, task.bands)
+        _, nav = _panel.mark_to_market(dates, grid.positions, grid.cash)
+
+    rows = []
+    for l, weeks in enumerate(task.lookbacks):
+        for k, (top_n, hold_n) in enumerate(task.bands):
+            variant = SweepVariant(weeks, top_n, hold_n, task.rebalance_months, task.start_date)
+            if variant not in task.variants:
+                continue
+            row = dict(variant._asdict(), end_date=dates[-1] if dates else None, rebalances=len(dates))
+            if grid is not None:
+                row['trades'] = int(grid.buys[l, k].sum() + grid.sells[l, k].sum())
+                row.update(run_metrics(grid.values[l, k], dates, _initial_capital, 12 / task.rebalance_months))
+                daily = nav_metrics(nav[l, k])
+                row.update(daily_volatility=daily['volatility'], daily_sharpe=daily['sharpe'],
+                           daily_max_drawdown=daily['max_drawdown'])
+            rows.append(row)
+    return rows
+
+
+def run_sweep(panel: PricePanel, variants: List[SweepVariant], end_date: date,
+              initial_capital: float = 1000000, workers: Optional[int] = None,
+              progress: bool = True) -> pd.DataFrame:
+    """
+    Backtest many variants in parallel
+
+    Variants sharing a rebalance schedule are simulated together with
+    simulate_momentum_grid; the resulting grids are spread over the
+    worker processes.
+
+    Args:
+        panel: Daily closes covering every variant's lookback and rebalance dates
+        variants: Configurations to run (see sweep_grid)
+        end_date: Last rebalance date for every variant
+        initial_capital: Starting capital
+        workers: Worker processes (default: SWEEP_WORKERS; 1 runs in this process)
+        progress: Show a progress bar
+
+    Returns:
+        DataFrame with one row per variant: its parameters, rebalances,
+        trades, run_metrics columns and daily_* nav_metrics of its daily NAV
+    """
+    workers = max(1, min(workers or SWEEP_WORKERS, len(variants)))
+    tasks = _sweep_tasks(variants, workers)
+    workers = min(workers, len(tasks))
+    shm, spec = _share_panel(panel)
+    rows = []
+    try:
+        with tqdm(total=len(variants), desc="Backtesting", unit="variant", disable=not progress) as pbar:
+            if workers == 1:
+                _init_worker(spec, end_date, initial_capital)
+                for task_rows in map(_run_task, tasks):
+                    rows.extend(task_rows)
+                    pbar.update(len(task_rows))
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(spec, end_date, initial_capital)) as executor:
+                    for task_rows in executor.map(_run_task, tasks):
+                        rows.extend(task_rows)
+                        pbar.update(len(task_rows))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return pd.DataFrame(rows, columns=list(SweepVariant._fields) + [
+        'end_date', 'rebalances', 'trades', 'final_value', 'total_return',
+        'annualized_return', 'volatility', 'sharpe', 'max_drawdown',
+        'daily_volatility', 'daily_sharpe', 'daily_max_drawdown'
+    ])
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v]
+
+
+def _date_list(value: str) -> List[date]:
+    return [date.fromisoformat(v) for v in value.split(',') if v]
+
+
+def main():
+    """Run a sweep from the command line and save the results table"""
+    parser = argparse.ArgumentParser(
+        description="Parallel parameter sweep for NSE 200 momentum backtests",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python backtest_sweep.py                                   # The 6m/12m strategies
+  python backtest_sweep.py --lookbacks 13,26,39,52 --top 10,20,30 --hold 20,40,60
+  python backtest_sweep.py --rebalance-months 1,3 --start-dates 2024-01-01,2025-01-01
+        """
+    )
+    parser.add_argument('--lookbacks', type=_int_list, default=[WEEKS_6M, WEEKS_12M],
+                        help='Lookback windows in weeks (comma-separated)')
+    parser.add_argument('--top', type=_int_list, default=[TOP_20_COUNT],
+                        help='Buy band sizes (comma-separated)')
+    parser.add_argument('--hold', type=_int_list, default=[TOP_40_COUNT],
+                        help='Hold band sizes (comma-separated)')
+    parser.add_argument('--rebalance-months', type=_int_list, default=[1],
+                        help='Months between rebalances (comma-separated)')
+    parser.add_argument('--start-dates', type=_date_list,
+                        help='First rebalance dates, YYYY-MM-DD (default: a year before --end-date)')
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today(),
+                        help='Last rebalance date, YYYY-MM-DD (default: today)')
+    parser.add_argument('--workers', type=int, help=f'Worker processes (default: {SWEEP_WORKERS})')
+    parser.add_argument('--output', default='sweep_results.csv', help='CSV file for the results table')
+    args = parser.parse_args()
+
+    from backtest_strategies import NSEMomentumBacktester
+
+    start_dates = args.start_dates or [args.end_date - timedelta(days=365)]
+    variants = sweep_grid(args.lookbacks, args.top, args.hold, args.rebalance_months, start_dates)
+    if not variants:
+        parser.error("No variants to run (every hold band is narrower than every buy band)")
+    skipped = len(set(args.top)) * len(set(args.hold)) * len(set(args.lookbacks)) * \
+        len(set(args.rebalance_months)) * len(set(start_dates)) - len(variants)
+    print(f"Sweeping {len(variants)} variants" + (f" ({skipped} with hold < top skipped)" if skipped else ""))
+
+    backtester = NSEMomentumBacktester()
+    panel = backtester.load_price_panel(min(start_dates) - timedelta(weeks=max(args.lookbacks)), args.end_date)
+    results = run_sweep(panel, variants, args.end_date, backtester.initial_capital, args.workers)
+
+    results.to_csv(args.output, index=False)
+    print(f"\nResults saved to {args.output}")
+    print("\nTop variants by annualized return:")
+    print(results.sort_values('annualized_return', ascending=False).head(10).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
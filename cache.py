@@ -2,40 +2,200 @@
 API caching system for Upstox API responses
 """
 
+import atexit
 import json
 import os
 import hashlib
+import threading
 import time
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Any, Optional, Union
 from datetime import datetime, timedelta
 
+from cache_backends import CacheBackend, CacheEntry, create_backend
+from cache_metrics import METRICS_DUMP, CacheMetrics, metrics_dir, write_run_metrics
+from cache_policy import NEGATIVE_URL_PREFIX, TTLPolicy
+from candle_codec import resident_size
+
+DEFAULT_BACKEND = os.getenv('API_CACHE_BACKEND', 'sqlite')
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv('MEMORY_CACHE_MAX_ENTRIES', 4096))
+MEMORY_CACHE_MAX_MB = float(os.getenv('MEMORY_CACHE_MAX_MB', 64))
+STALE_WHILE_REVALIDATE = os.getenv('CACHE_STALE_WHILE_REVALIDATE', '0') == '1'
+MAX_STALE_SECONDS = float(os.getenv('CACHE_MAX_STALE_SECONDS', 6 * 3600))
+REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', 2))
+MAX_DISK_MB = float(os.getenv('CACHE_MAX_DISK_MB', 1024))
+EVICTION_POLICY = os.getenv('CACHE_EVICTION_POLICY', 'lru')
+QUOTA_LOW_WATERMARK = 0.9  # Evict down to this fraction of the quota
+
+
+class MemoryLRU:
+    """
+    In-memory tier of parsed responses, bounded by entry count and bytes
+    
+    Sizes approximate what each parsed response holds on to: the decoded
+    column arrays of candle responses, the stored size of anything else
+    (see candle_codec.resident_size). The least recently used entries are
+    evicted first.
+    """
+    
+    def __init__(self, max_entries: int, max_bytes: int):
+        """
+        Initialize the memory tier
+        
+        Args:
+            max_entries: Maximum number of resident entries
+            max_bytes: Maximum total (resident) size of entries
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # cache_key -> CacheEntry
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+    
+    def get(self, cache_key: str) -> Optional[CacheEntry]:
+        """Return the entry for a key and mark it most recently used"""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+            return entry
+    
+    def put(self, cache_key: str, entry: CacheEntry) -> None:
+        """Insert or replace an entry, evicting least recently used ones to stay in bounds"""
+        entry = entry._replace(size=resident_size(entry.response, entry.size))
+        with self._lock:
+            self._discard(cache_key)
+            if entry.size > self.max_bytes or self.max_entries <= 0:
+                return  # Would evict everything else; serve it from the backend instead
+            
+            self._entries[cache_key] = entry
+            self._bytes += entry.size
+            
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+                self.evicted_bytes += evicted.size
+    
+    def _discard(self, cache_key: str) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+    
+    def pop(self, cache_key: str) -> None:
+        """Remove an entry if present"""
+        with self._lock:
+            self._discard(cache_key)
+    
+    def remove_expired(self, now: float) -> None:
+        """Remove entries that expired before now"""
+        with self._lock:
+            for cache_key in [k for k, entry in self._entries.items() if not entry.is_fresh(now)]:
+                self._discard(cache_key)
+    
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get occupancy and eviction statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes
+            }
+
 
 class APICache:
     """
-    File-based cache for API responses with TTL (Time To Live) support
+    Cache for API responses with TTL (Time To Live) support
+    
+    Entries are persisted by a pluggable storage backend (see
+    cache_backends.py) and fronted by an in-memory copy of recently used
+    responses. The SQLite backend is safe to share between processes.
+    Each entry's expiry is fixed when it is stored, by a TTLPolicy (see
+    cache_policy.py): historical ranges never expire, live data does.
+    
+    In stale-while-revalidate mode, fetch() answers with an expired entry
+    (up to max_stale_seconds past its expiry) and refreshes it on a
+    background thread instead of making the caller wait for the network.
+    
+    Stored data is kept under a disk quota by evicting the least recently
+    (or least frequently) used entries.
+    
+    Lookups, stores, evictions and their latencies are counted in
+    self.metrics (see cache_metrics.py) and dumped as JSON at exit.
     """
     
-    def __init__(self, cache_dir: str = ".cache", ttl_hours: int = 1, verbose: bool = False):
+    def __init__(self, cache_dir: str = ".cache", ttl_hours: int = 1, verbose: bool = False,
+                 backend: Union[str, CacheBackend, None] = None,
+                 max_memory_entries: int = None, max_memory_mb: float = None,
+                 policy: TTLPolicy = None, stale_while_revalidate: bool = None,
+                 max_stale_seconds: float = None, max_disk_mb: float = None,
+                 eviction_policy: str = None):
         """
         Initialize the cache
         
         Args:
             cache_dir: Directory to store cache files
-            ttl_hours: Time to live for cached data in hours
+            ttl_hours: Time to live in hours for responses the policy has no rule for
             verbose: Enable verbose output (default: False for clean progress bars)
+            backend: Backend name ('sqlite' or 'file') or instance (default: API_CACHE_BACKEND)
+            max_memory_entries: Memory tier entry cap (default: MEMORY_CACHE_MAX_ENTRIES)
+            max_memory_mb: Memory tier size cap in MB (default: MEMORY_CACHE_MAX_MB)
+            policy: TTL policy (default: TTLPolicy with ttl_hours as its default TTL)
+            stale_while_revalidate: Serve expired entries while refreshing them (default: CACHE_STALE_WHILE_REVALIDATE)
+            max_stale_seconds: How long past expiry an entry may still be served (default: CACHE_MAX_STALE_SECONDS)
+            max_disk_mb: Quota for stored data in MB, 0 for none (default: CACHE_MAX_DISK_MB)
+            eviction_policy: 'lru' or 'lfu' (default: CACHE_EVICTION_POLICY)
         """
         self.cache_dir = cache_dir
         self.ttl_seconds = ttl_hours * 3600
+        self.policy = policy or TTLPolicy(default_ttl=self.ttl_seconds)
+        self.stale_while_revalidate = (
+            STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate
+        )
+        self.max_stale_seconds = MAX_STALE_SECONDS if max_stale_seconds is None else max_stale_seconds
+        self._refresh_executor = None  # Created on first background refresh
+        self._refreshing = {}  # cache_key -> Future of the in-flight refresh
+        self._refresh_lock = threading.Lock()
+        self.stale_served = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
         self.verbose = verbose
-        self._cache_memory = {}  # In-memory cache for frequently accessed items
-        self._cache_timestamps = {}  # Track timestamps to avoid file I/O
+        self._cache_memory = MemoryLRU(  # Recently used responses
+            MEMORY_CACHE_MAX_ENTRIES if max_memory_entries is None else max_memory_entries,
+            int((MEMORY_CACHE_MAX_MB if max_memory_mb is None else max_memory_mb) * 1024 * 1024)
+        )
+        
+        self.max_disk_bytes = int((MAX_DISK_MB if max_disk_mb is None else max_disk_mb) * 1024 * 1024)
+        self.eviction_policy = eviction_policy or EVICTION_POLICY
+        if self.eviction_policy not in CacheBackend.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{self.eviction_policy}'. Use 'lru' or 'lfu'")
+        self._bytes_since_quota_check = 0
+        self.disk_evictions = 0
+        self.disk_evicted_bytes = 0
         
-        # Create cache directory if it doesn't exist
-        if not os.path.exists(cache_dir):
-            os.makedirs(cache_dir)
+        if not isinstance(backend, CacheBackend):
+            backend = create_backend(backend or DEFAULT_BACKEND, cache_dir)
+        self.backend = backend
+        atexit.register(self.backend.flush_access)  # Keep access history for eviction
         
-        # Preload cache metadata for performance
-        self._load_cache_metadata()
+        self.metrics = CacheMetrics()
+        if METRICS_DUMP:
+            atexit.register(self.dump_metrics)
     
     def _get_cache_key(self, url: str, params: Dict[str, Any] = None) -> str:
         """
@@ -58,117 +218,85 @@ class APICache:
         cache_str = json.dumps(cache_data, sort_keys=True)
         return hashlib.md5(cache_str.encode()).hexdigest()
     
-    def _get_cache_file_path(self, cache_key: str) -> str:
-        """Get the full path for a cache file"""
-        return os.path.join(self.cache_dir, f"{cache_key}.json")
+    def _is_servable_stale(self, entry: CacheEntry, now: float) -> bool:
+        """Whether an expired entry is still within the max-staleness bound"""
+        return entry.expires_at is not None and now - entry.expires_at <= self.max_stale_seconds
     
-    def _load_cache_metadata(self) -> None:
-        """Preload cache metadata to avoid repeated file I/O"""
-        if not os.path.exists(self.cache_dir):
-            return
-        
-        current_time = time.time()
-        
-        for filename in os.listdir(self.cache_dir):
-            if not filename.endswith('.json'):
-                continue
-            
-            cache_key = filename[:-5]  # Remove .json extension
-            file_path = os.path.join(self.cache_dir, filename)
-            
-            try:
-                # Just read the timestamp, not the full data
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                
-                cached_time = cache_data.get('timestamp', 0)
-                
-                # Only track non-expired entries
-                if current_time - cached_time <= self.ttl_seconds:
-                    self._cache_timestamps[cache_key] = cached_time
-                else:
-                    # Clean up expired file immediately
-                    os.remove(file_path)
-                    
-            except (json.JSONDecodeError, FileNotFoundError, KeyError):
-                # Remove corrupted files
-                try:
-                    os.remove(file_path)
-                except:
-                    pass
-    
-    def get(self, url: str, params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+    def _lookup(self, url: str, cache_key: str, now: float) -> Optional[CacheEntry]:
         """
-        Get cached response if available and not expired
+        Find an entry that is fresh or still servable stale
         
-        Args:
-            url: The API URL
-            params: Request parameters
-            
-        Returns:
-            Cached response data or None if not found/expired
+        Expired entries are kept while they are within the max-staleness
+        bound (callers decide whether to serve them), and deleted after.
         """
-        cache_key = self._get_cache_key(url, params)
-        
         # Fast path: Check in-memory cache first
-        if cache_key in self._cache_memory:
-            cached_time = self._cache_timestamps.get(cache_key, 0)
-            current_time = time.time()
-            
-            if current_time - cached_time <= self.ttl_seconds:
+        started = time.perf_counter()
+        entry = self._cache_memory.get(cache_key)
+        if entry is not None:
+            if entry.is_fresh(now) or self._is_servable_stale(entry, now):
+                self.backend.touch(cache_key, now)
+                self._record_hit('memory', url, entry, now, started)
                 if self.verbose:
-                    print(f"Cache HIT (memory) for {url} (age: {int((current_time - cached_time)/60)} minutes)")
-                return self._cache_memory[cache_key]
+                    print(f"Cache HIT (memory) for {url} (age: {int((now - entry.timestamp)/60)} minutes)")
+                return entry
             else:
                 # Expired, remove from memory
-                del self._cache_memory[cache_key]
-                del self._cache_timestamps[cache_key]
+                self._cache_memory.pop(cache_key)
         
-        # Check metadata before file I/O
-        if cache_key not in self._cache_timestamps:
+        started = time.perf_counter()
+        entry = self.backend.read(cache_key)
+        if entry is None:
+            self._record_miss(url)
             return None
         
-        cached_time = self._cache_timestamps[cache_key]
-        current_time = time.time()
-        
-        if current_time - cached_time > self.ttl_seconds:
+        if not (entry.is_fresh(now) or self._is_servable_stale(entry, now)):
             # Expired
-            del self._cache_timestamps[cache_key]
-            cache_file = self._get_cache_file_path(cache_key)
-            try:
-                os.remove(cache_file)
-            except:
-                pass
+            self.backend.delete(cache_key)
+            self._record_miss(url)
             return None
         
-        # Load from file and cache in memory
-        cache_file = self._get_cache_file_path(cache_key)
+        # Cache in memory for faster future access
+        self._cache_memory.put(cache_key, entry)
+        self.backend.touch(cache_key, now)
+        self._record_hit('disk', url, entry, now, started)
         
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
-            
-            response_data = cache_data.get('response')
-            
-            # Cache in memory for faster future access
-            self._cache_memory[cache_key] = response_data
-            
-            if self.verbose:
-                print(f"Cache HIT (file) for {url} (age: {int((current_time - cached_time)/60)} minutes)")
-            
-            return response_data
+        if self.verbose:
+            print(f"Cache HIT ({self.backend.name}) for {url} (age: {int((now - entry.timestamp)/60)} minutes)")
+        
+        return entry
+    
+    def _record_hit(self, tier: str, url: str, entry: CacheEntry, now: float, started: float) -> None:
+        """Count a lookup answered by a tier; expired entries count as stale, not hits"""
+        if url.startswith(NEGATIVE_URL_PREFIX):
+            self.metrics.incr('negative_hits')  # Failure bookkeeping, not response caching
+        elif entry.is_fresh(now):
+            self.metrics.hit(tier, url, time.perf_counter() - started, entry.size)
+        else:
+            self.metrics.incr('stale_hits')
+    
+    def _record_miss(self, url: str) -> None:
+        self.metrics.incr('negative_misses' if url.startswith(NEGATIVE_URL_PREFIX) else 'misses')
+    
+    def get(self, url: str, params: Dict[str, Any] = None, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get cached response if available and not expired
+        
+        Args:
+            url: The API URL
+            params: Request parameters
+            allow_stale: Also return an expired entry within the max-staleness bound
             
-        except (json.JSONDecodeError, FileNotFoundError, KeyError):
-            # Corrupted cache file, clean up
-            if cache_key in self._cache_timestamps:
-                del self._cache_timestamps[cache_key]
-            try:
-                os.remove(cache_file)
-            except:
-                pass
+        Returns:
+            Cached response data or None if not found/expired
+        """
+        current_time = time.time()
+        entry = self._lookup(url, self._get_cache_key(url, params), current_time)
+        
+        if entry is None or not (entry.is_fresh(current_time) or allow_stale):
             return None
+        return entry.response
     
-    def set(self, url: str, response_data: Dict[str, Any], params: Dict[str, Any] = None) -> None:
+    def set(self, url: str, response_data: Dict[str, Any], params: Dict[str, Any] = None) -> Optional[CacheEntry]:
         """
         Store response in cache
         
@@ -176,95 +304,280 @@ class APICache:
             url: The API URL
             response_data: The API response data
             params: Request parameters
+            
+        Returns:
+            The stored entry, or None if it could not be stored
         """
         cache_key = self._get_cache_key(url, params)
-        cache_file = self._get_cache_file_path(cache_key)
         current_time = time.time()
-        
-        cache_data = {
-            'timestamp': current_time,
-            'url': url,
-            'params': params or {},
-            'response': response_data
-        }
+        expires_at = self.policy.expires_at(url, params, current_time)
         
         try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, separators=(',', ':'))  # Compact JSON for speed
+            started = time.perf_counter()
+            entry = self.backend.write(cache_key, url, params, response_data, current_time, expires_at)
+            self.metrics.observe('write', time.perf_counter() - started)
+            self.metrics.incr('sets')
+            self.metrics.incr('bytes_written', entry.size)
             
             # Update in-memory cache
-            self._cache_memory[cache_key] = response_data
-            self._cache_timestamps[cache_key] = current_time
+            self._cache_memory.put(cache_key, entry)
+            
+            # Check the quota after every ~5% of it has been written
+            self._bytes_since_quota_check += entry.size
+            if self.max_disk_bytes and self._bytes_since_quota_check > self.max_disk_bytes / 20:
+                self.enforce_quota()
             
             if self.verbose:
                 print(f"Cache SET for {url}")
             
+            return entry
+            
         except Exception as e:
+            self.metrics.incr('set_failures')
             if self.verbose:
                 print(f"Warning: Failed to cache response for {url}: {e}")
+            return None
     
-    def clear_expired(self) -> int:
+    def fetch(self, url: str, params: Dict[str, Any], fetcher: Callable[[], Optional[Dict[str, Any]]],
+              allow_stale: bool = None) -> Optional[CacheEntry]:
         """
-        Remove all expired cache files
+        Get a response from the cache, calling fetcher on a miss
         
+        When stale entries are allowed, an expired entry within the
+        max-staleness bound is returned immediately and refreshed by
+        calling fetcher on a background thread.
+        
+        Args:
+            url: The API URL
+            params: Request parameters
+            fetcher: Performs the request; returns the response or None on failure
+            allow_stale: Per-call override of stale_while_revalidate (pass False
+                for prices that orders are sized from)
+                
         Returns:
-            Number of files removed
+            The cache entry (its timestamp tells how old the data is), or None
+            if the response is not cached and fetcher failed
         """
-        if not os.path.exists(self.cache_dir):
-            return 0
+        if allow_stale is None:
+            allow_stale = self.stale_while_revalidate
         
-        removed_count = 0
+        cache_key = self._get_cache_key(url, params)
         current_time = time.time()
+        entry = self._lookup(url, cache_key, current_time)
         
-        for filename in os.listdir(self.cache_dir):
-            if not filename.endswith('.json'):
-                continue
-                
-            file_path = os.path.join(self.cache_dir, filename)
+        if entry is not None:
+            if entry.is_fresh(current_time):
+                return entry
+            if allow_stale:
+                self.stale_served += 1
+                self._schedule_refresh(cache_key, url, params, fetcher)
+                return entry
+        
+        response_data = self._call_fetcher(fetcher)
+        if response_data is None:
+            return None
+        return self.set(url, response_data, params) or CacheEntry(current_time, response_data, 0, None)
+    
+    def _call_fetcher(self, fetcher: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Call a fetcher, timing it as a network read"""
+        started = time.perf_counter()
+        try:
+            response_data = fetcher()
+        finally:
+            self.metrics.observe('network', time.perf_counter() - started)
+        self.metrics.incr('fetches' if response_data is not None else 'fetch_failures')
+        return response_data
+    
+    def set_negative(self, instkey: str, reason: str, transient: bool = False) -> None:
+        """
+        Remember that requests for an instrument are failing
+        
+        Args:
+            instkey: Upstox instrument key
+            reason: Why the request failed (e.g. 'HTTP 400')
+            transient: Failure may clear up soon (server or network error)
+        """
+        url = f"{NEGATIVE_URL_PREFIX}{instkey}"
+        response = {'instkey': instkey, 'reason': reason, 'transient': transient}
+        self.set(url, response, {'transient': transient})
+        
+        # Only one of the transient/permanent variants should be live
+        other_key = self._get_cache_key(url, {'transient': not transient})
+        self._cache_memory.pop(other_key)
+        self.backend.delete(other_key)
+    
+    def get_negative(self, instkey: str) -> Optional[str]:
+        """
+        Get the recorded failure reason for an instrument
+        
+        Args:
+            instkey: Upstox instrument key
             
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                
-                cached_time = cache_data.get('timestamp', 0)
-                
-                if current_time - cached_time > self.ttl_seconds:
-                    os.remove(file_path)
-                    removed_count += 1
-                    
-            except (json.JSONDecodeError, FileNotFoundError, KeyError):
-                # Corrupted file, remove it
-                os.remove(file_path)
-                removed_count += 1
+        Returns:
+            Failure reason, or None if the instrument has no live negative entry
+        """
+        url = f"{NEGATIVE_URL_PREFIX}{instkey}"
+        for transient in (False, True):
+            response = self.get(url, {'transient': transient})
+            if response is not None:
+                return response['reason']
+        return None
+    
+    def get_negative_entries(self) -> Dict[str, Dict[str, Any]]:
+        """
+        List live negative entries
+        
+        Returns:
+            Dict mapping instrument key to {'reason', 'transient', 'expires_in'} (seconds)
+        """
+        current_time = time.time()
+        negatives = {}
+        for _, entry in self.backend.find(NEGATIVE_URL_PREFIX):
+            if entry.is_fresh(current_time):
+                negatives[entry.response['instkey']] = {
+                    'reason': entry.response['reason'],
+                    'transient': entry.response['transient'],
+                    'expires_in': entry.expires_at - current_time
+                }
+        return negatives
+    
+    def _schedule_refresh(self, cache_key: str, url: str, params: Dict[str, Any],
+                          fetcher: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        """Refresh an entry in the background unless a refresh is already in flight"""
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=REFRESH_WORKERS, thread_name_prefix="cache-refresh"
+                )
+            self._refreshing[cache_key] = self._refresh_executor.submit(
+                self._refresh, cache_key, url, params, fetcher
+            )
+    
+    def _refresh(self, cache_key: str, url: str, params: Dict[str, Any],
+                 fetcher: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        try:
+            response_data = self._call_fetcher(fetcher)
+            if response_data is not None:
+                self.set(url, response_data, params)
+                self.refreshes += 1
+            else:
+                self.refresh_failures += 1
+        except Exception as e:
+            self.refresh_failures += 1
+            if self.verbose:
+                print(f"Warning: Background refresh failed for {url}: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.pop(cache_key, None)
+    
+    def wait_for_refreshes(self, timeout: float = None) -> None:
+        """
+        Wait for in-flight background refreshes to finish
+        
+        Args:
+            timeout: Maximum seconds to wait (default: no limit)
+        """
+        with self._refresh_lock:
+            pending = list(self._refreshing.values())
+        if pending:
+            wait(pending, timeout=timeout)
+    
+    def clear_expired(self) -> int:
+        """
+        Remove all expired cache entries
+        
+        Returns:
+            Number of entries removed
+        """
+        # Keep entries stale-while-revalidate could still serve
+        cutoff = time.time()
+        if self.stale_while_revalidate:
+            cutoff -= self.max_stale_seconds
+        removed_count = self.backend.delete_expired(cutoff)
+        
+        self._cache_memory.remove_expired(cutoff)
+        self.enforce_quota()
         
         if removed_count > 0 and self.verbose:
-            print(f"Cleaned up {removed_count} expired cache files")
+            print(f"Cleaned up {removed_count} expired cache entries")
         
         return removed_count
     
-    def clear_all(self) -> int:
+    def enforce_quota(self) -> int:
         """
-        Remove all cache files
+        Evict entries until stored data fits the disk quota
         
         Returns:
-            Number of files removed
+            Number of entries evicted
         """
-        if not os.path.exists(self.cache_dir):
+        self._bytes_since_quota_check = 0
+        if not self.max_disk_bytes:
             return 0
         
-        removed_count = 0
+        evicted = self.backend.evict(
+            self.max_disk_bytes, int(self.max_disk_bytes * QUOTA_LOW_WATERMARK), self.eviction_policy
+        )
+        for cache_key, size in evicted:
+            self._cache_memory.pop(cache_key)
+            self.disk_evicted_bytes += size
+        self.disk_evictions += len(evicted)
+        
+        if evicted and self.verbose:
+            print(f"Evicted {len(evicted)} cache entries to stay under {self.max_disk_bytes / 1024 / 1024:,.0f} MB")
+        
+        return len(evicted)
+    
+    def compact(self) -> int:
+        """
+        Enforce the quota and rewrite fragmented storage
+        
+        Returns:
+            Number of bytes reclaimed on disk
+        """
+        self.enforce_quota()
+        return self.backend.compact()
+    
+    def clear_all(self) -> int:
+        """
+        Remove all cache entries
         
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(self.cache_dir, filename)
-                os.remove(file_path)
-                removed_count += 1
+        Returns:
+            Number of entries removed
+        """
+        removed_count = self.backend.clear()
+        self._cache_memory.clear()
         
         if removed_count > 0 and self.verbose:
-            print(f"Cleared {removed_count} cache files")
+            print(f"Cleared {removed_count} cache entries")
         
         return removed_count
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get live instrumentation counters
+        
+        Returns:
+            Snapshot from CacheMetrics, with eviction counts and the backend name
+        """
+        metrics = self.metrics.snapshot()
+        metrics['counters']['memory_evictions'] = self._cache_memory.evictions
+        metrics['counters']['disk_evictions'] = self.disk_evictions
+        metrics['backend'] = self.backend.name
+        return metrics
+    
+    def dump_metrics(self) -> Optional[str]:
+        """
+        Write this run's metrics as JSON (see cache_metrics.write_run_metrics)
+        
+        Returns:
+            Path of the dump, or None if the cache was not used
+        """
+        if self.metrics.is_empty():
+            return None
+        return write_run_metrics(metrics_dir(self.cache_dir), self.get_metrics())
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """
         Get cache statistics
@@ -272,53 +585,59 @@ class APICache:
         Returns:
             Dictionary with cache stats
         """
-        if not os.path.exists(self.cache_dir):
-            return {'total_files': 0, 'expired_files': 0, 'valid_files': 0}
-        
-        current_time = time.time()
-        total_files = 0
-        expired_files = 0
-        valid_files = 0
-        
-        for filename in os.listdir(self.cache_dir):
-            if not filename.endswith('.json'):
-                continue
-                
-            total_files += 1
-            file_path = os.path.join(self.cache_dir, filename)
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                
-                cached_time = cache_data.get('timestamp', 0)
-                
-                if current_time - cached_time > self.ttl_seconds:
-                    expired_files += 1
-                else:
-                    valid_files += 1
-                    
-            except (json.JSONDecodeError, FileNotFoundError, KeyError):
-                expired_files += 1
+        stats = self.backend.stats(time.time())
         
         return {
-            'total_files': total_files,
-            'expired_files': expired_files,
-            'valid_files': valid_files,
+            'total_files': stats['total'],
+            'expired_files': stats['expired'],
+            'valid_files': stats['total'] - stats['expired'],
+            'immutable_files': stats['immutable'],
+            'total_bytes': stats['bytes'],
+            'backend': self.backend.name,
+            'memory': self._cache_memory.get_stats(),
+            'stale_while_revalidate': self.stale_while_revalidate,
+            'stale_served': self.stale_served,
+            'background_refreshes': self.refreshes,
+            'refresh_failures': self.refresh_failures,
+            'negative_entries': self.get_negative_entries(),
+            'quota_bytes': self.max_disk_bytes,
+            'eviction_policy': self.eviction_policy,
+            'disk_evictions': self.disk_evictions,
+            'disk_evicted_bytes': self.disk_evicted_bytes,
+            'metrics': self.get_metrics(),
             'cache_dir': self.cache_dir,
-            'ttl_hours': self.ttl_seconds / 3600
+            'ttl_hours': self.ttl_seconds / 3600,
+            'interval_ttls': dict(self.policy.interval_ttls)
         }
 
 
-# Global cache instance (non-verbose by default for clean progress bars)
-api_cache = APICache(verbose=False)
+# Global cache instance, created on first use so importing this module stays cheap
+_api_cache: Optional[APICache] = None
+_api_cache_lock = threading.Lock()
+
+
+def get_api_cache() -> APICache:
+    """Get the global cache (non-verbose by default for clean progress bars), creating it if needed"""
+    global _api_cache
+    if _api_cache is None:
+        with _api_cache_lock:
+            if _api_cache is None:
+                _api_cache = APICache(verbose=False)
+    return _api_cache
+
+
+def __getattr__(name: str) -> Any:
+    # `from cache import api_cache` resolves to the lazily created instance
+    if name == 'api_cache':
+        return get_api_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def clear_cache():
     """Convenience function to clear all cached data"""
-    return api_cache.clear_all()
+    return get_api_cache().clear_all()
 
 
 def get_cache_stats():
     """Convenience function to get cache statistics"""
-    return api_cache.get_cache_stats()
\ No newline at end of file
+    return get_api_cache().get_cache_stats()
@@ -0,0 +1,647 @@
+"""
+Storage backends for APICache
+
+A backend persists (key -> timestamp, expiry, url, params, response)
+entries; an expiry of None marks an immutable entry. Responses are
+serialized by candle_codec, so candle payloads are stored as compressed
+columns. FileBackend keeps one file per entry plus a metadata manifest;
+SQLiteBackend keeps everything in one WAL-mode database so several
+processes can share a warm cache safely.
+"""
+
+import json
+import lzma
+import os
+import sqlite3
+import threading
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from candle_codec import decode_response, encode_response
+
+
+class CacheEntry(NamedTuple):
+    """A cached response and its metadata"""
+    timestamp: float
+    response: Any
+    size: int  # Stored (serialized) size in bytes; resident size in the memory tier
+    expires_at: Optional[float]  # None: never expires
+    
+    def is_fresh(self, now: float) -> bool:
+        return self.expires_at is None or now < self.expires_at
+
+
+class CacheBackend:
+    """
+    Interface implemented by APICache storage backends
+    
+    Accesses recorded with touch() are buffered and written in batches, so
+    cache hits do not each cost a write; they drive quota eviction.
+    """
+    
+    name = "base"
+    ACCESS_FLUSH_THRESHOLD = 256  # Buffered accesses that trigger a flush
+    EVICTION_POLICIES = ('lru', 'lfu')
+    
+    def __init__(self):
+        self._pending_access = {}  # cache_key -> (last access time, hits since last flush)
+        self._access_lock = threading.Lock()
+    
+    def touch(self, cache_key: str, now: float) -> None:
+        """Record a cache hit for eviction bookkeeping"""
+        with self._access_lock:
+            _, hits = self._pending_access.get(cache_key, (0, 0))
+            self._pending_access[cache_key] = (now, hits + 1)
+            should_flush = len(self._pending_access) >= self.ACCESS_FLUSH_THRESHOLD
+        if should_flush:
+            self.flush_access()
+    
+    def flush_access(self) -> None:
+        """Write buffered access records to storage"""
+        with self._access_lock:
+            pending, self._pending_access = self._pending_access, {}
+        if pending:
+            self._write_access(pending)
+    
+    def _write_access(self, pending: Dict[str, Tuple[float, int]]) -> None:
+        raise NotImplementedError
+    
+    def evict(self, max_bytes: int, target_bytes: int, policy: str = 'lru') -> List[Tuple[str, int]]:
+        """
+        Evict entries when total size exceeds max_bytes
+        
+        Args:
+            max_bytes: Size that triggers eviction
+            target_bytes: Size to shrink to once triggered
+            policy: 'lru' (least recently used first) or 'lfu' (least hits first)
+            
+        Returns:
+            (cache_key, size) of each evicted entry
+        """
+        raise NotImplementedError
+    
+    def compact(self) -> int:
+        """Rewrite fragmented storage; returns the number of bytes reclaimed"""
+        raise NotImplementedError
+    
+    def read(self, cache_key: str) -> Optional[CacheEntry]:
+        """Return the entry for a key, or None if absent or unreadable"""
+        raise NotImplementedError
+    
+    def write(self, cache_key: str, url: str, params: Dict[str, Any], response: Any,
+              timestamp: float, expires_at: Optional[float]) -> CacheEntry:
+        """Store an entry atomically and return it as read() would"""
+        raise NotImplementedError
+    
+    def delete(self, cache_key: str) -> bool:
+        """Remove an entry; returns True if something was removed"""
+        raise NotImplementedError
+    
+    def delete_expired(self, now: float) -> int:
+        """Remove entries that expired before now; returns the number removed"""
+        raise NotImplementedError
+    
+    def clear(self) -> int:
+        """Remove all entries; returns the number removed"""
+        raise NotImplementedError
+    
+    def stats(self, now: float) -> Dict[str, int]:
+        """Count entries, expired and immutable entries, and total bytes"""
+        raise NotImplementedError
+    
+    def find(self, url_prefix: str) -> List[Tuple[str, CacheEntry]]:
+        """Return (url, entry) for every entry whose URL starts with url_prefix"""
+        raise NotImplementedError
+
+
+class FileBackend(CacheBackend):
+    """
+    One file per entry, indexed by an append-only manifest
+    
+    Entry metadata (key, timestamp, expiry, size, URL, encoding) lives in the
+    manifest, which is read in one shot at startup, so neither startup nor
+    stats/expiry have to open every cache file. JSON responses are stored
+    as <key>.json (with their metadata), encoded candle payloads as bare
+    <key>.bin. Files are written to a temporary name and renamed into
+    place, so readers never see half-written data.
+    """
+    
+    name = "file"
+    MANIFEST_FILE = "_manifest.jsonl"
+    
+    def __init__(self, cache_dir: str):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self._index = {}  # cache_key -> {'timestamp', 'expires_at', 'size', 'url', 'encoding', 'last_access', 'hits'}
+        self._manifest_offset = 0  # Bytes of the manifest already folded into _index
+        self._manifest_lock = threading.Lock()
+        
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        
+        self._load_manifest()
+    
+    def _get_cache_file_path(self, cache_key: str, encoding: str = 'json') -> str:
+        """Get the full path for a cache file"""
+        extension = 'json' if encoding == 'json' else 'bin'
+        return os.path.join(self.cache_dir, f"{cache_key}.{extension}")
+    
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        """Write a file via a temporary name so readers never see partial data"""
+        tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, path)
+    
+    def _get_manifest_path(self) -> str:
+        """Get the full path for the metadata manifest"""
+        return os.path.join(self.cache_dir, self.MANIFEST_FILE)
+    
+    def _append_manifest(self, record: Dict[str, Any]) -> None:
+        """Append one metadata record (a set or a delete) to the manifest and apply it to the index"""
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        with self._manifest_lock:
+            with open(self._get_manifest_path(), 'a', encoding='utf-8') as f:
+                f.write(line)
+            self._fold_record(record)
+    
+    def _fold_manifest_line(self, line: str) -> None:
+        """Apply one manifest line to the in-memory index (caller holds _manifest_lock)"""
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return  # Partially written line from a concurrent writer
+        self._fold_record(record)
+    
+    def _fold_record(self, record: Dict[str, Any]) -> None:
+        """Apply one manifest record to the in-memory index (caller holds _manifest_lock)"""
+        cache_key = record.get('key')
+        if not cache_key:
+            return
+        
+        if record.get('deleted'):
+            self._index.pop(cache_key, None)
+        elif 'access' in record:
+            meta = self._index.get(cache_key)
+            if meta is not None:
+                meta['last_access'] = max(meta['last_access'], record['access'])
+                meta['hits'] += record.get('hits', 1)
+        else:
+            self._index[cache_key] = {
+                'timestamp': record.get('timestamp', 0),
+                'expires_at': record.get('expires_at', 0),  # Records without one predate TTL policies
+                'size': record.get('size', 0),
+                'url': record.get('url', ''),
+                'encoding': record.get('encoding', 'json'),
+                'last_access': record.get('last_access', record.get('timestamp', 0)),
+                'hits': record.get('hits', 0)
+            }
+    
+    def _refresh_index(self) -> None:
+        """Fold in manifest records appended (possibly by other processes) since the last read"""
+        manifest_path = self._get_manifest_path()
+        # Held across read, fold and offset update so concurrent refreshes
+        # neither fold overlapping chunks nor apply them out of order
+        with self._manifest_lock:
+            try:
+                if os.path.getsize(manifest_path) <= self._manifest_offset:
+                    return
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    f.seek(self._manifest_offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            
+            # Only consume complete lines; a trailing partial line is read next time
+            complete = data[:data.rfind("\n") + 1]
+            for line in complete.splitlines():
+                self._fold_manifest_line(line)
+            self._manifest_offset += len(complete.encode('utf-8'))
+    
+    def _index_snapshot(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Current index entries, after folding in other processes' records"""
+        self._refresh_index()
+        with self._manifest_lock:
+            return [(cache_key, dict(meta)) for cache_key, meta in self._index.items()]
+    
+    def _rebuild_manifest(self) -> None:
+        """Rebuild the manifest from cache files (one-time migration of older caches)"""
+        self._index = {}
+        
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.bin'):
+                # Binary payloads carry no metadata of their own
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    pass
+                continue
+            if not filename.endswith('.json'):
+                continue
+            
+            cache_key = filename[:-5]  # Remove .json extension
+            file_path = os.path.join(self.cache_dir, filename)
+            
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+                
+                self._index[cache_key] = {
+                    'timestamp': cache_data.get('timestamp', 0),
+                    'expires_at': cache_data.get('expires_at', 0),
+                    'size': os.path.getsize(file_path),
+                    'url': cache_data.get('url', ''),
+                    'encoding': 'json',
+                    'last_access': cache_data.get('timestamp', 0),
+                    'hits': 0
+                }
+            except (json.JSONDecodeError, FileNotFoundError, KeyError):
+                # Remove corrupted files
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+        
+        self._write_manifest()
+    
+    def _write_manifest(self) -> None:
+        """Atomically rewrite the manifest with only the live entries"""
+        manifest_path = self._get_manifest_path()
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        
+        with self._manifest_lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for cache_key, meta in self._index.items():
+                    record = {'key': cache_key, **meta}
+                    f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            os.replace(tmp_path, manifest_path)
+            self._manifest_offset = os.path.getsize(manifest_path)
+    
+    def _load_manifest(self) -> None:
+        """Load the metadata index from the manifest in a single read"""
+        manifest_path = self._get_manifest_path()
+        if not os.path.exists(manifest_path):
+            self._rebuild_manifest()
+            return
+        
+        self._refresh_index()
+        
+        # Compact the log when superseded records dominate it
+        with open(manifest_path, 'rb') as f:
+            line_count = sum(1 for _ in f)
+        if line_count > 2 * len(self._index) + 100:
+            self._write_manifest()
+    
+    def read(self, cache_key: str) -> Optional[CacheEntry]:
+        # Check metadata before file I/O; pick up entries other processes added
+        if cache_key not in self._index:
+            self._refresh_index()
+        meta = self._index.get(cache_key)
+        if meta is None:
+            return None
+        
+        try:
+            if meta['encoding'] == 'json':
+                with open(self._get_cache_file_path(cache_key), 'r', encoding='utf-8') as f:
+                    cache_data = json.load(f)
+                return CacheEntry(cache_data.get('timestamp', 0), cache_data.get('response'),
+                                  meta['size'], cache_data.get('expires_at', 0))
+            
+            with open(self._get_cache_file_path(cache_key, meta['encoding']), 'rb') as f:
+                response = decode_response(meta['encoding'], f.read())
+            return CacheEntry(meta['timestamp'], response, meta['size'], meta['expires_at'])
+        except (ValueError, OSError, KeyError, EOFError, zlib.error, lzma.LZMAError):
+            # Corrupted cache file, clean up
+            self.delete(cache_key)
+            return None
+    
+    def write(self, cache_key: str, url: str, params: Dict[str, Any], response: Any,
+              timestamp: float, expires_at: Optional[float]) -> CacheEntry:
+        encoding, payload, value = encode_response(response)
+        
+        if encoding == 'json':
+            cache_data = {
+                'timestamp': timestamp,
+                'expires_at': expires_at,
+                'url': url,
+                'params': params or {},
+                'response': response
+            }
+            payload = json.dumps(cache_data, separators=(',', ':')).encode('utf-8')  # Compact JSON for speed
+        
+        self._write_atomic(self._get_cache_file_path(cache_key, encoding), payload)
+        
+        # Drop a copy left in the other format by an earlier codec setting
+        stale_encoding = 'candles' if encoding == 'json' else 'json'
+        try:
+            os.remove(self._get_cache_file_path(cache_key, stale_encoding))
+        except OSError:
+            pass
+        
+        meta = {'timestamp': timestamp, 'expires_at': expires_at, 'size': len(payload),
+                'url': url, 'encoding': encoding, 'last_access': timestamp, 'hits': 0}
+        self._append_manifest({'key': cache_key, **meta})
+        return CacheEntry(timestamp, value, len(payload), expires_at)
+    
+    def delete(self, cache_key: str) -> bool:
+        removed = False
+        for encoding in ('json', 'candles'):
+            try:
+                os.remove(self._get_cache_file_path(cache_key, encoding))
+                removed = True
+            except OSError:
+                pass
+        
+        self._append_manifest({'key': cache_key, 'deleted': True})
+        return removed
+    
+    @staticmethod
+    def _is_expired(meta: Dict[str, Any], now: float) -> bool:
+        return meta['expires_at'] is not None and meta['expires_at'] <= now
+    
+    def delete_expired(self, now: float) -> int:
+        expired_keys = [
+            cache_key for cache_key, meta in self._index_snapshot()
+            if self._is_expired(meta, now)
+        ]
+        return sum(1 for cache_key in expired_keys if self.delete(cache_key))
+    
+    def clear(self) -> int:
+        if not os.path.exists(self.cache_dir):
+            return 0
+        
+        removed_count = 0
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith(('.json', '.bin')):
+                os.remove(os.path.join(self.cache_dir, filename))
+                removed_count += 1
+        
+        self._index = {}
+        self._write_manifest()
+        return removed_count
+    
+    def stats(self, now: float) -> Dict[str, int]:
+        metas = [meta for _, meta in self._index_snapshot()]
+        return {
+            'total': len(metas),
+            'expired': sum(1 for meta in metas if self._is_expired(meta, now)),
+            'immutable': sum(1 for meta in metas if meta['expires_at'] is None),
+            'bytes': sum(meta['size'] for meta in metas),
+        }
+    
+    def find(self, url_prefix: str) -> List[Tuple[str, CacheEntry]]:
+        found = []
+        for cache_key, meta in self._index_snapshot():
+            if meta['url'].startswith(url_prefix):
+                entry = self.read(cache_key)
+                if entry is not None:
+                    found.append((meta['url'], entry))
+        return found
+    
+    def _write_access(self, pending: Dict[str, Tuple[float, int]]) -> None:
+        lines = [
+            json.dumps({'key': cache_key, 'access': last_access, 'hits': hits}, separators=(',', ':')) + "\n"
+            for cache_key, (last_access, hits) in pending.items()
+        ]
+        with self._manifest_lock:
+            with open(self._get_manifest_path(), 'a', encoding='utf-8') as f:
+                f.write(''.join(lines))
+            for cache_key, (last_access, hits) in pending.items():
+                meta = self._index.get(cache_key)
+                if meta is not None:
+                    meta['last_access'] = max(meta['last_access'], last_access)
+                    meta['hits'] += hits
+    
+    def evict(self, max_bytes: int, target_bytes: int, policy: str = 'lru') -> List[Tuple[str, int]]:
+        self.flush_access()
+        entries = self._index_snapshot()
+        
+        total_bytes = sum(meta['size'] for _, meta in entries)
+        if total_bytes <= max_bytes:
+            return []
+        
+        if policy == 'lfu':
+            order = sorted(entries, key=lambda item: (item[1]['hits'], item[1]['last_access']))
+        else:
+            order = sorted(entries, key=lambda item: item[1]['last_access'])
+        
+        evicted = []
+        for cache_key, meta in order:
+            if total_bytes <= target_bytes:
+                break
+            self.delete(cache_key)
+            total_bytes -= meta['size']
+            evicted.append((cache_key, meta['size']))
+        return evicted
+    
+    def _disk_usage(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.is_file())
+    
+    def compact(self) -> int:
+        self.flush_access()
+        self._refresh_index()
+        before = self._disk_usage()
+        
+        # Remove orphaned payloads and leftover temporary files
+        for filename in os.listdir(self.cache_dir):
+            cache_key, _, extension = filename.partition('.')
+            orphan = extension in ('json', 'bin') and cache_key not in self._index
+            if orphan or filename.endswith('.tmp'):
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    pass
+        
+        self._write_manifest()
+        return max(0, before - self._disk_usage())
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Single SQLite database in WAL mode
+    
+    Writes are atomic transactions, readers never block each other or the
+    writer, and expiry is an indexed DELETE on the expires_at column.
+    """
+    
+    name = "sqlite"
+    DB_FILE = "api_cache.sqlite3"
+    SCHEMA_VERSION = 1
+    
+    def __init__(self, cache_dir: str, busy_timeout: float = 10.0):
+        super().__init__()
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, self.DB_FILE)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()  # One connection per thread
+        
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        
+        self._create_schema()
+    
+    def _create_schema(self) -> None:
+        """Create the entries table and its indexes if they do not exist yet"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " timestamp REAL NOT NULL,"
+                " expires_at REAL,"
+                " size INTEGER NOT NULL,"
+                " url TEXT,"
+                " params TEXT,"
+                " encoding TEXT NOT NULL,"
+                " payload BLOB NOT NULL,"
+                " last_access REAL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_expires_at ON entries (expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def read(self, cache_key: str) -> Optional[CacheEntry]:
+        row = self._connect().execute(
+            "SELECT timestamp, encoding, payload, size, expires_at FROM entries WHERE key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        try:
+            return CacheEntry(row[0], decode_response(row[1], row[2]), row[3], row[4])
+        except (ValueError, EOFError, zlib.error, lzma.LZMAError):
+            self.delete(cache_key)
+            return None
+    
+    def write(self, cache_key: str, url: str, params: Dict[str, Any], response: Any,
+              timestamp: float, expires_at: Optional[float]) -> CacheEntry:
+        encoding, payload, value = encode_response(response)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (key, timestamp, expires_at, size, url, params, encoding, payload, last_access, hits)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (cache_key, timestamp, expires_at, len(payload), url,
+                 json.dumps(params or {}, sort_keys=True), encoding, sqlite3.Binary(payload), timestamp)
+            )
+        return CacheEntry(timestamp, value, len(payload), expires_at)
+    
+    def delete(self, cache_key: str) -> bool:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM entries WHERE key = ?", (cache_key,))
+        return cursor.rowcount > 0
+    
+    def delete_expired(self, now: float) -> int:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        return cursor.rowcount
+    
+    def clear(self) -> int:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM entries")
+        return cursor.rowcount
+    
+    def stats(self, now: float) -> Dict[str, int]:
+        total, expired, immutable, total_bytes = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(expires_at <= ?), 0),"
+            " COALESCE(SUM(expires_at IS NULL), 0), COALESCE(SUM(size), 0) FROM entries",
+            (now,)
+        ).fetchone()
+        return {'total': total, 'expired': expired, 'immutable': immutable, 'bytes': total_bytes}
+    
+    def find(self, url_prefix: str) -> List[Tuple[str, CacheEntry]]:
+        rows = self._connect().execute(
+            "SELECT url, timestamp, encoding, payload, size, expires_at FROM entries WHERE substr(url, 1, ?) = ?",
+            (len(url_prefix), url_prefix)
+        ).fetchall()
+        return [
+            (url, CacheEntry(timestamp, decode_response(encoding, payload), size, expires_at))
+            for url, timestamp, encoding, payload, size, expires_at in rows
+        ]
+    
+    def _write_access(self, pending: Dict[str, Tuple[float, int]]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "UPDATE entries SET last_access = MAX(COALESCE(last_access, 0), ?), hits = hits + ?"
+                " WHERE key = ?",
+                [(last_access, hits, cache_key) for cache_key, (last_access, hits) in pending.items()]
+            )
+    
+    def evict(self, max_bytes: int, target_bytes: int, policy: str = 'lru') -> List[Tuple[str, int]]:
+        self.flush_access()
+        conn = self._connect()
+        
+        total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total_bytes <= max_bytes:
+            return []
+        
+        order = "hits, last_access" if policy == 'lfu' else "last_access"
+        evicted = []
+        for cache_key, size in conn.execute(f"SELECT key, size FROM entries ORDER BY {order}"):
+            if total_bytes <= target_bytes:
+                break
+            total_bytes -= size
+            evicted.append((cache_key, size))
+        
+        with conn:
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(cache_key,) for cache_key, _ in evicted])
+        return evicted
+    
+    def _disk_usage(self) -> int:
+        return sum(
+            os.path.getsize(path) for path in (self.db_path, f"{self.db_path}-wal")
+            if os.path.exists(path)
+        )
+    
+    def compact(self) -> int:
+        self.flush_access()
+        before = self._disk_usage()
+        
+        conn = self._connect()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return max(0, before - self._disk_usage())
+
+
+BACKENDS = {
+    FileBackend.name: FileBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def create_backend(name: str, cache_dir: str) -> CacheBackend:
+    """
+    Create a cache backend by name
+    
+    Args:
+        name: Backend name ('file' or 'sqlite')
+        cache_dir: Directory the backend stores data in
+        
+    Returns:
+        The backend instance
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown cache backend '{name}'. Use one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name](cache_dir)
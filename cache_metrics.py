@@ -0,0 +1,212 @@
+"""
+Instrumentation for the API cache
+
+Counts lookups by outcome (memory hit, disk hit, stale, miss), stores,
+evictions and bytes moved, and keeps latency histograms for memory reads,
+backend reads, writes and network fetches. A snapshot is written as JSON
+at the end of every run so runs can be compared when tuning TTLs.
+"""
+
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+METRICS_DUMP = os.getenv('CACHE_METRICS_DUMP', '1') != '0'
+METRICS_DIR = os.getenv('CACHE_METRICS_DIR')  # Default: <cache_dir>/metrics
+METRICS_KEEP = int(os.getenv('CACHE_METRICS_KEEP', 50))  # Run dumps to keep
+HOT_ENTRIES = 10  # Most-hit URLs reported per run
+
+# Upper bounds of the latency buckets in milliseconds (the last one is open-ended)
+LATENCY_BUCKETS_MS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Latency distribution over fixed logarithmic buckets"""
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+    
+    def observe(self, ms: float) -> None:
+        """Record one measurement in milliseconds"""
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+    
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (0-100)"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary plus non-empty buckets keyed by their upper bound"""
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_ms,
+            'buckets': {
+                (str(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else 'inf'): n
+                for i, n in enumerate(self.counts) if n
+            }
+        }
+
+
+class CacheMetrics:
+    """
+    Live counters and latency histograms for one APICache
+    
+    Counter names used by APICache: memory_hits, disk_hits, stale_hits,
+    misses, sets, set_failures, fetches, fetch_failures, bytes_read,
+    bytes_written, and negative_hits/negative_misses for failure lookups
+    (kept out of the hit ratio). Histograms: memory, disk, write, network.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters = Counter()
+        self.histograms = {}
+        self._hot = Counter()  # url -> hits
+    
+    def incr(self, name: str, n: int = 1) -> None:
+        """Add n to a counter"""
+        with self._lock:
+            self.counters[name] += n
+    
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a latency measurement"""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.observe(seconds * 1000)
+    
+    def hit(self, tier: str, url: str, seconds: float, size: int = 0) -> None:
+        """Record a lookup answered from 'memory' or 'disk'"""
+        with self._lock:
+            self.counters[f'{tier}_hits'] += 1
+            if tier == 'disk':
+                self.counters['bytes_read'] += size
+            self._hot[url] += 1
+        self.observe(tier, seconds)
+    
+    def is_empty(self) -> bool:
+        """Whether nothing has been recorded"""
+        with self._lock:
+            return not self.counters
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the current counters
+        
+        Returns:
+            Dict with 'counters', 'hit_ratio' (fresh hits per lookup),
+            'latency_ms' per histogram and 'hot_entries' ([url, hits] pairs)
+        """
+        with self._lock:
+            counters = dict(self.counters)
+            latency = {name: histogram.to_dict() for name, histogram in self.histograms.items()}
+            hot = [[url, hits] for url, hits in self._hot.most_common(HOT_ENTRIES)]
+        
+        hits = counters.get('memory_hits', 0) + counters.get('disk_hits', 0)
+        lookups = hits + counters.get('stale_hits', 0) + counters.get('misses', 0)
+        return {
+            'started_at': self.started_at,
+            'counters': counters,
+            'lookups': lookups,
+            'hit_ratio': hits / lookups if lookups else None,
+            'latency_ms': latency,
+            'hot_entries': hot
+        }
+
+
+def metrics_dir(cache_dir: str) -> str:
+    """Directory run dumps are written to"""
+    return METRICS_DIR or os.path.join(cache_dir, 'metrics')
+
+
+def write_run_metrics(directory: str, metrics: Dict[str, Any]) -> Optional[str]:
+    """
+    Write a run's metrics as JSON, keeping only the newest METRICS_KEEP dumps
+    
+    Args:
+        directory: Dump directory
+        metrics: Snapshot to write (run details are added)
+        
+    Returns:
+        Path of the dump, or None if it could not be written
+    """
+    finished_at = time.time()
+    record = dict(metrics, finished_at=finished_at, pid=os.getpid(), argv=sys.argv)
+    stamp = datetime.fromtimestamp(finished_at).strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(directory, f"run-{stamp}-{os.getpid()}.json")
+    
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(record, f, indent=2)
+        
+        for old in sorted(glob.glob(os.path.join(directory, 'run-*.json')))[:-METRICS_KEEP]:
+            os.remove(old)
+        return path
+    except OSError:
+        return None
+
+
+def load_last_run_metrics(directory: str) -> Optional[Dict[str, Any]]:
+    """Load the newest run dump, or None if there is none"""
+    dumps = sorted(glob.glob(os.path.join(directory, 'run-*.json')), key=os.path.getmtime)
+    for path in reversed(dumps):
+        try:
+            with open(path, 'r') as f:
+                return dict(json.load(f), path=path)
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def format_metrics(metrics: Dict[str, Any]) -> List[str]:
+    """Human-readable lines for a metrics snapshot"""
+    counters = metrics.get('counters', {})
+    ratio = metrics.get('hit_ratio')
+    lines = [
+        f"Lookups: {metrics.get('lookups', 0)} "
+        f"(memory hits {counters.get('memory_hits', 0)}, disk hits {counters.get('disk_hits', 0)}, "
+        f"stale {counters.get('stale_hits', 0)}, misses {counters.get('misses', 0)})"
+        + (f", hit ratio {ratio:.1%}" if ratio is not None else ""),
+        f"Stores: {counters.get('sets', 0)} ({counters.get('set_failures', 0)} failed), "
+        f"network fetches: {counters.get('fetches', 0)} ({counters.get('fetch_failures', 0)} failed)",
+        f"Bytes read: {counters.get('bytes_read', 0) / 1024:,.1f} KB, "
+        f"written: {counters.get('bytes_written', 0) / 1024:,.1f} KB",
+        f"Evictions: memory {counters.get('memory_evictions', 0)}, disk {counters.get('disk_evictions', 0)}"
+    ]
+    for name, latency in sorted(metrics.get('latency_ms', {}).items()):
+        lines.append(
+            f"Latency {name}: n={latency['count']}, mean {latency['mean_ms']:.3g} ms, "
+            f"p50 <={latency['p50_ms']:g} ms, p95 <={latency['p95_ms']:g} ms, max {latency['max_ms']:.3g} ms"
+        )
+    hot = metrics.get('hot_entries')
+    if hot:
+        lines.append("Hot entries:")
+        lines.extend(f"  {hits:>5}  {url}" for url, hits in hot)
+    return lines
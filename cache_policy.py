@@ -0,0 +1,105 @@
+"""
+TTL policy for cached Upstox responses
+
+Historical candles for a range that closed before today never change, so
+those responses are kept until explicitly cleared. Responses that still
+include the current trading period expire after a per-interval TTL, and
+market quotes after a few seconds. Negative entries (instruments whose
+requests failed) expire after hours, or minutes for transient failures.
+"""
+
+import calendar
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+NEGATIVE_URL_PREFIX = "negative:"  # URL namespace for cached request failures
+
+# Seconds an open-ended response stays fresh, per candle interval ('quote' for LTP)
+DEFAULT_INTERVAL_TTLS = {
+    'day': int(os.getenv('CACHE_TTL_DAY', 900)),
+    'week': int(os.getenv('CACHE_TTL_WEEK', 3600)),
+    'month': int(os.getenv('CACHE_TTL_MONTH', 3600)),
+    'quote': int(os.getenv('CACHE_TTL_QUOTE', 30)),
+    'negative': int(os.getenv('CACHE_TTL_NEGATIVE', 6 * 3600)),
+    'negative_transient': int(os.getenv('CACHE_TTL_NEGATIVE_TRANSIENT', 300)),
+}
+IMMUTABLE_CLOSED_RANGES = os.getenv('CACHE_IMMUTABLE_CLOSED_RANGES', '1') != '0'
+
+
+def _period_end(day: date, interval: str) -> date:
+    """Last calendar day of the candle period containing day"""
+    if interval == 'week':
+        return day + timedelta(days=6 - day.weekday())
+    if interval == 'month':
+        return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+    return day
+
+
+class TTLPolicy:
+    """
+    Decide how long a cached response stays fresh
+    
+    A response whose range ends in a candle period that closed before
+    today (IST) is immutable and never expires. Anything else expires
+    after the TTL for its interval, or the default TTL if the interval
+    is unknown.
+    """
+    
+    def __init__(self, default_ttl: float = 3600, interval_ttls: Dict[str, float] = None,
+                 immutable_closed_ranges: bool = IMMUTABLE_CLOSED_RANGES):
+        """
+        Initialize the policy
+        
+        Args:
+            default_ttl: TTL in seconds for responses with no known interval
+            interval_ttls: TTL in seconds per interval (default: DEFAULT_INTERVAL_TTLS)
+            immutable_closed_ranges: Never expire ranges that closed before today
+        """
+        self.default_ttl = default_ttl
+        self.interval_ttls = dict(DEFAULT_INTERVAL_TTLS if interval_ttls is None else interval_ttls)
+        self.immutable_closed_ranges = immutable_closed_ranges
+    
+    def interval_ttl(self, interval: str) -> float:
+        """TTL in seconds for open-ended data of an interval"""
+        return self.interval_ttls.get(interval, self.default_ttl)
+    
+    def ttl_for(self, url: str, params: Dict[str, Any] = None, today: date = None) -> Optional[float]:
+        """
+        Get the TTL for a response
+        
+        Args:
+            url: The API URL
+            params: Request parameters (candle requests carry 'interval' and 'end_date')
+            today: Reference date (default: today in IST)
+            
+        Returns:
+            TTL in seconds, or None if the response never expires
+        """
+        params = params or {}
+        
+        if url.startswith(NEGATIVE_URL_PREFIX):
+            return self.interval_ttl('negative_transient' if params.get('transient') else 'negative')
+        
+        if '/market-quote/' in url:
+            return self.interval_ttl('quote')
+        
+        interval = params.get('interval')
+        end_date = params.get('end_date')
+        
+        if self.immutable_closed_ranges and interval and end_date:
+            today = today or datetime.now(IST).date()
+            try:
+                if _period_end(date.fromisoformat(str(end_date)), interval) < today:
+                    return None
+            except ValueError:
+                pass  # Not a YYYY-MM-DD date; treat as open-ended
+        
+        return self.interval_ttl(interval) if interval else self.default_ttl
+    
+    def expires_at(self, url: str, params: Dict[str, Any], timestamp: float) -> Optional[float]:
+        """Expiry time for a response stored at timestamp, or None if it never expires"""
+        ttl = self.ttl_for(url, params)
+        return None if ttl is None else timestamp + ttl
@@ -0,0 +1,145 @@
+"""
+Compact binary encoding for cached API responses
+
+Historical-candle responses are stored as columnar arrays (int64 epoch
+timestamps plus float64 OHLCV/OI columns) compressed with zlib or lzma,
+and decode straight to NumPy arrays. Every other response is stored as
+compact JSON. NumPy is only imported once a candle payload is encoded
+or decoded.
+"""
+
+import json
+import lzma
+import os
+import struct
+import zlib
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+CANDLE_CODEC = os.getenv('CACHE_CANDLE_CODEC', 'zlib')  # 'zlib', 'lzma' or 'json' (no binary encoding)
+
+_MAGIC = b'UPXC'
+_HEADER = struct.Struct('<4sBI')  # magic, format version, row count
+_VERSION = 1
+
+_COMPRESSORS = {
+    'zlib': (lambda data: zlib.compress(data, 6), zlib.decompress),
+    'lzma': (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+
+
+def _is_candle_response(response: Any) -> bool:
+    """Whether a response is exactly a successful historical-candle payload"""
+    if not isinstance(response, dict) or set(response) != {'status', 'data'}:
+        return False
+    data = response['data']
+    return (
+        response['status'] == 'success'
+        and isinstance(data, dict) and set(data) == {'candles'}
+        and isinstance(data['candles'], (list, dict))
+    )
+
+
+def encode_candles(candles, method: str) -> Tuple[bytes, Dict[str, 'np.ndarray']]:
+    """
+    Encode candle rows as compressed columns
+    
+    Args:
+        candles: Raw Upstox candle rows (or columns from candles_to_columns)
+        method: Compression method ('zlib' or 'lzma')
+        
+    Returns:
+        (payload, columns) where columns is what the payload decodes to
+    """
+    import numpy as np
+    from candle_store import COLUMNS, candles_to_columns
+    
+    columns = candles_to_columns(candles)
+    body = columns['timestamp'].astype('<i8').tobytes()
+    body += np.stack([columns[name] for name in COLUMNS]).astype('<f8').tobytes()
+    
+    compress, _ = _COMPRESSORS[method]
+    return _HEADER.pack(_MAGIC, _VERSION, len(columns['timestamp'])) + compress(body), columns
+
+
+def decode_candles(payload: bytes, method: str) -> Dict[str, 'np.ndarray']:
+    """
+    Decode a payload from encode_candles into (read-only) column arrays
+    
+    Args:
+        payload: Encoded bytes
+        method: Compression method used to encode them
+        
+    Returns:
+        Dict with 'timestamp' (int64 epoch seconds) and float64 OHLCV columns
+    """
+    import numpy as np
+    from candle_store import COLUMNS
+    
+    magic, version, rows = _HEADER.unpack_from(payload)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("Not an encoded candle payload")
+    
+    _, decompress = _COMPRESSORS[method]
+    body = decompress(payload[_HEADER.size:])
+    
+    columns = {'timestamp': np.frombuffer(body, dtype='<i8', count=rows)}
+    values = np.frombuffer(body, dtype='<f8', offset=rows * 8).reshape(len(COLUMNS), rows)
+    for i, name in enumerate(COLUMNS):
+        columns[name] = values[i]
+    return columns
+
+
+def encode_response(response: Any, codec: str = None) -> Tuple[str, bytes, Any]:
+    """
+    Serialize a response for storage
+    
+    Args:
+        response: The API response data
+        codec: Candle compression ('zlib', 'lzma' or 'json'; default: CACHE_CANDLE_CODEC)
+        
+    Returns:
+        (encoding, payload, value) where value is what decode_response returns
+    """
+    codec = codec or CANDLE_CODEC
+    if codec in _COMPRESSORS and _is_candle_response(response):
+        payload, columns = encode_candles(response['data']['candles'], codec)
+        return f"candles-{codec}", payload, {'status': 'success', 'data': {'candles': columns}}
+    
+    return 'json', json.dumps(response, separators=(',', ':')).encode('utf-8'), response
+
+
+def resident_size(response: Any, stored_size: int) -> int:
+    """
+    Approximate bytes a decoded response holds in memory
+    
+    Candle payloads decode to column arrays several times larger than
+    their compressed form, so their array bytes are counted; other
+    responses are assumed to be about their stored size.
+    """
+    data = response.get('data') if isinstance(response, dict) else None
+    candles = data.get('candles') if isinstance(data, dict) else None
+    if isinstance(candles, dict):
+        return sum(getattr(column, 'nbytes', 0) for column in candles.values())
+    return stored_size
+
+
+def decode_response(encoding: str, payload: bytes) -> Any:
+    """
+    Deserialize a stored response
+    
+    Args:
+        encoding: Encoding name returned by encode_response
+        payload: Stored bytes
+        
+    Returns:
+        The response; candle payloads carry column arrays instead of rows
+    """
+    if encoding == 'json':
+        return json.loads(payload)
+    if encoding.startswith('candles-'):
+        columns = decode_candles(payload, encoding[len('candles-'):])
+        return {'status': 'success', 'data': {'candles': columns}}
+    raise ValueError(f"Unknown cache encoding '{encoding}'")
@@ -0,0 +1,311 @@
+"""
+Columnar local OHLCV store for Upstox candles
+
+Each (instrument_key, interval) pair is kept as one uncompressed NumPy
+.npz file holding a sorted int64 timestamp column plus float64 OHLCV
+columns, so range queries are a binary search over local arrays instead
+of a JSON parse or a network call.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone, date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Upstox candle timestamps are in IST
+IST = timezone(timedelta(hours=5, minutes=30))
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'oi')
+
+
+def to_epoch(timestamp: str) -> int:
+    """Convert an ISO candle timestamp to epoch seconds"""
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=IST)
+    return int(dt.timestamp())
+
+
+def date_to_epoch(day: str, end_of_day: bool = False) -> int:
+    """Convert a YYYY-MM-DD date to epoch seconds at IST midnight (or end of day)"""
+    dt = datetime.fromisoformat(day).replace(tzinfo=IST)
+    if end_of_day:
+        dt += timedelta(days=1, seconds=-1)
+    return int(dt.timestamp())
+
+
+def candles_to_columns(candles: List[List]) -> Dict[str, np.ndarray]:
+    """
+    Convert raw Upstox candle rows to sorted columnar arrays
+
+    Args:
+        candles: Rows of [timestamp, open, high, low, close, volume, oi], or
+            columns already in this form (as decoded from the API cache)
+
+    Returns:
+        Dict with 'timestamp' (int64 epoch seconds) and float64 OHLCV columns
+    """
+    if isinstance(candles, dict):
+        return candles
+
+    if not candles:
+        columns = {'timestamp': np.empty(0, dtype=np.int64)}
+        columns.update({name: np.empty(0, dtype=np.float64) for name in COLUMNS})
+        return columns
+
+    timestamps = np.fromiter((to_epoch(row[0]) for row in candles), dtype=np.int64, count=len(candles))
+    values = np.array(
+        [[float(v) for v in (list(row[1:7]) + [0] * (7 - len(row)))] for row in candles],
+        dtype=np.float64
+    )
+
+    order = np.argsort(timestamps, kind='stable')
+    columns = {'timestamp': timestamps[order]}
+    for i, name in enumerate(COLUMNS):
+        columns[name] = values[order, i]
+    return columns
+
+
+class CandleStore:
+    """
+    Persistent per-instrument OHLCV store with date-range coverage tracking
+    """
+
+    def __init__(self, store_dir: str = ".candles"):
+        """
+        Initialize the store
+
+        Args:
+            store_dir: Directory to store candle segments
+        """
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        self._memory = {}  # (instkey, interval) -> (mtime, segment dict)
+
+    def _segment_path(self, instkey: str, interval: str) -> str:
+        """Get the file path for an instrument/interval segment"""
+        safe_key = instkey.replace('|', '__').replace(':', '_').replace('/', '_')
+        return os.path.join(self.store_dir, interval, f"{safe_key}.npz")
+
+    def _load_segment(self, instkey: str, interval: str) -> Optional[Dict[str, np.ndarray]]:
+        """Load a segment, reusing the in-memory copy while the file is unchanged"""
+        path = self._segment_path(instkey, interval)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        cached = self._memory.get((instkey, interval))
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with np.load(path) as data:
+                segment = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError):
+            return None
+
+        self._memory[(instkey, interval)] = (mtime, segment)
+        return segment
+
+    def covers(self, instkey: str, interval: str, start_date: str, end_date: str,
+               max_age_seconds: float = 3600) -> bool:
+        """
+        Check whether stored data answers a date range without the network
+
+        Bars that were already closed when fetched are permanent, so ranges
+        ending before the provisional (fetched-intraday) part of the segment
+        are covered forever. Ranges reaching it are only covered if synced
+        within max_age_seconds.
+
+        Args:
+            instkey: Upstox instrument key
+            interval: Candle interval ('day', 'week', 'month')
+            start_date: Range start (YYYY-MM-DD)
+            end_date: Range end (YYYY-MM-DD)
+            max_age_seconds: Freshness bound for ranges that include today
+
+        Returns:
+            True if the store fully covers the range
+        """
+        segment = self._load_segment(instkey, interval)
+        if segment is None:
+            return False
+
+        covered_from, covered_to = (str(d) for d in segment['coverage'])
+        if covered_from > start_date or covered_to < end_date:
+            return False
+
+        provisional_from = str(segment['provisional_from'][0])
+        if provisional_from and end_date >= provisional_from:
+            synced_at = float(segment['synced_at'][0])
+            return time.time() - synced_at <= max_age_seconds
+
+        return True
+
+    def sync_start(self, instkey: str, interval: str, start_date: str, end_date: str) -> str:
+        """
+        Find where a fetch must start to bring a range up to date
+
+        When the stored segment already covers the start of the range, only
+        the tail after its coverage is missing, plus any bars stored while
+        still provisional. Bars before provisional_from are final and are
+        not refetched. Otherwise the whole range is needed.
+
+        Args:
+            instkey: Upstox instrument key
+            interval: Candle interval
+            start_date: Range start (YYYY-MM-DD)
+            end_date: Range end (YYYY-MM-DD)
+
+        Returns:
+            Date (YYYY-MM-DD) to fetch from
+        """
+        segment = self._load_segment(instkey, interval)
+        if segment is None:
+            return start_date
+
+        covered_from, covered_to = (str(d) for d in segment['coverage'])
+        if covered_from > start_date or _next_day(covered_to) < start_date:
+            return start_date
+
+        candidates = [_next_day(covered_to)]
+        provisional_from = str(segment['provisional_from'][0])
+        if provisional_from:
+            candidates.append(provisional_from)
+
+        return min(max(min(candidates), start_date), end_date)
+
+    def read(self, instkey: str, interval: str, start_date: Optional[str] = None,
+             end_date: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Read stored candles within a date range
+
+        Args:
+            instkey: Upstox instrument key
+            interval: Candle interval
+            start_date: Inclusive range start (YYYY-MM-DD), None for all
+            end_date: Inclusive range end (YYYY-MM-DD), None for all
+
+        Returns:
+            Dict of column arrays sorted by timestamp (ascending), or None
+            if nothing is stored for this instrument/interval
+        """
+        segment = self._load_segment(instkey, interval)
+        if segment is None:
+            return None
+
+        timestamps = segment['timestamp']
+        lo = 0 if start_date is None else np.searchsorted(timestamps, date_to_epoch(start_date), side='left')
+        hi = len(timestamps) if end_date is None else np.searchsorted(
+            timestamps, date_to_epoch(end_date, end_of_day=True), side='right'
+        )
+
+        result = {'timestamp': timestamps[lo:hi]}
+        for name in COLUMNS:
+            result[name] = segment[name][lo:hi]
+        return result
+
+    def write(self, instkey: str, interval: str, candles: List[List],
+              start_date: str, end_date: str, synced_at: Optional[float] = None) -> None:
+        """
+        Merge fetched candles into the store
+
+        Newly fetched rows replace stored rows with the same timestamp.
+        Coverage is extended when the fetched range touches the stored one.
+
+        Args:
+            instkey: Upstox instrument key
+            interval: Candle interval
+            candles: Raw Upstox candle rows for the fetched range
+            start_date: Fetched range start (YYYY-MM-DD)
+            end_date: Fetched range end (YYYY-MM-DD)
+            synced_at: When the candles were fetched from the API (default: now)
+        """
+        new = candles_to_columns(candles)
+        today = ist_today()
+
+        # Bars from today onward may still change until the session closes
+        provisional_from = max(start_date, today) if end_date >= today else ''
+        if synced_at is None:
+            synced_at = time.time()
+
+        with self._lock:
+            old = self._load_segment(instkey, interval)
+            coverage = (start_date, end_date)
+
+            if old is not None:
+                merged_ts = np.concatenate([new['timestamp'], old['timestamp']])
+                # np.unique keeps the first occurrence, so fresh rows win
+                timestamps, index = np.unique(merged_ts, return_index=True)
+                merged = {'timestamp': timestamps}
+                for name in COLUMNS:
+                    merged[name] = np.concatenate([new[name], old[name]])[index]
+                new = merged
+
+                old_from, old_to = (str(d) for d in old['coverage'])
+                touches = (
+                    start_date <= _next_day(old_to) and old_from <= _next_day(end_date)
+                )
+                if touches:
+                    coverage = (min(start_date, old_from), max(end_date, old_to))
+                elif old_to > end_date:
+                    coverage = (old_from, old_to)
+
+                # Older provisional bars stay provisional unless refetched now;
+                # a marker outside the resulting coverage no longer applies
+                old_provisional = str(old['provisional_from'][0])
+                refetched = start_date <= old_provisional and end_date >= old_to
+                if old_provisional and coverage[0] <= old_provisional <= coverage[1] and not refetched:
+                    provisional_from = min(filter(None, (old_provisional, provisional_from)))
+                    synced_at = float(old['synced_at'][0])
+
+            path = self._segment_path(instkey, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+
+            np.savez(
+                tmp_path,
+                coverage=np.array(coverage),
+                provisional_from=np.array([provisional_from]),
+                synced_at=np.array([synced_at]),
+                **new
+            )
+            os.replace(tmp_path, path)
+            self._memory.pop((instkey, interval), None)
+
+    def clear_all(self) -> int:
+        """
+        Remove all stored segments
+
+        Returns:
+            Number of segment files removed
+        """
+        if not os.path.exists(self.store_dir):
+            return 0
+
+        removed_count = 0
+        for root, _, files in os.walk(self.store_dir):
+            for filename in files:
+                if filename.endswith('.npz'):
+                    os.remove(os.path.join(root, filename))
+                    removed_count += 1
+
+        self._memory.clear()
+        return removed_count
+
+
+def ist_today() -> str:
+    """Today's date in IST (the exchange's calendar) as YYYY-MM-DD"""
+    return str(datetime.now(IST).date())
+
+
+def _next_day(day: str) -> str:
+    return str(date.fromisoformat(day) + timedelta(days=1))
+
+
+# Global store instance
+candle_store = CandleStore()
@@ -1,5 +1,8 @@
 """
 Configuration settings for NSE 200 winner algorithm
+
+The API token is resolved on first use (get_api_token), so commands that
+never call the API (--help, --cache-stats) run without credentials.
 """
 
 import os
@@ -12,11 +15,6 @@ load_dotenv()
 UPSTOX_API_VERSION = "2.0"
 UPSTOX_BASE_URL = "https://api-v2.upstox.com"
 
-# Get API token from environment variable
-API_TOKEN = os.getenv('UPSTOX_API_TOKEN')
-if not API_TOKEN:
-    raise ValueError("UPSTOX_API_TOKEN environment variable is required")
-
 # File paths
 NSE200_FILE = 'ind_nifty200list.xlsx'
 PORTFOLIO_12M_FILE = 'portfolio.csv'
@@ -28,17 +26,40 @@ TOP_40_COUNT = 40
 WEEKS_12M = 52
 WEEKS_6M = 26
 
+# Network concurrency
+MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', 8))
+
+# Maximum instruments per market-quote (LTP) request
+LTP_BATCH_SIZE = int(os.getenv('LTP_BATCH_SIZE', 500))
+
+# Upstox rate limits (documented standard API limits, shared across processes)
+UPSTOX_RATE_PER_SECOND = float(os.getenv('UPSTOX_RATE_PER_SECOND', 50))
+UPSTOX_RATE_PER_MINUTE = float(os.getenv('UPSTOX_RATE_PER_MINUTE', 500))
+
 # Capital management
 DEFAULT_PORTFOLIO_VALUE = 1000000  # 10 lakh rupees
 PORTFOLIO_VALUE = float(os.getenv('PORTFOLIO_VALUE', DEFAULT_PORTFOLIO_VALUE))
 CASH_RESERVE_PERCENTAGE = 0.05  # Keep 5% as cash reserve
 
+# Get API token from environment variable (on first use)
+def get_api_token():
+    token = os.getenv('UPSTOX_API_TOKEN')
+    if not token:
+        raise ValueError("UPSTOX_API_TOKEN environment variable is required")
+    return token
+
+def __getattr__(name):
+    # Keeps `from config import API_TOKEN` working without an import-time check
+    if name == 'API_TOKEN':
+        return get_api_token()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # API request headers
 def get_api_headers():
     return {
         "Api-Version": UPSTOX_API_VERSION,
         "Accept": "application/json",
-        "Authorization": f"Bearer {API_TOKEN}",
+        "Authorization": f"Bearer {get_api_token()}",
     }
 
 # Date calculation functions
@@ -0,0 +1,89 @@
+"""
+Shared HTTP client with pooled keep-alive sessions
+
+All modules fetch through these sessions so TCP/TLS connections to each
+host are opened once and reused for the whole run.
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Pool and timeout settings (env-overridable, no API token required)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 16))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 10))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def create_session(headers: Optional[Dict[str, str]] = None, pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """
+    Create a keep-alive session with a connection pool
+
+    Args:
+        headers: Default headers sent with every request
+        pool_size: Maximum pooled connections per host
+
+    Returns:
+        Configured requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    if headers:
+        session.headers.update(headers)
+    return session
+
+
+def get_session(name: str = 'default') -> requests.Session:
+    """
+    Get (or lazily create) a named shared session
+
+    Args:
+        name: Session name, e.g. 'upstox' or 'default'
+
+    Returns:
+        The shared requests.Session for that name
+    """
+    session = _sessions.get(name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = create_session()
+                _sessions[name] = session
+    return session
+
+
+def get(url: str, session: str = 'default',
+        timeout: Union[float, Tuple[float, float], None] = None, **kwargs) -> requests.Response:
+    """
+    GET a URL through a pooled shared session
+
+    Args:
+        url: URL to fetch
+        session: Shared session name
+        timeout: Request timeout (default: connect/read timeouts above)
+        **kwargs: Passed through to requests.Session.get
+
+    Returns:
+        The HTTP response
+    """
+    return get_session(session).get(url, timeout=timeout or DEFAULT_TIMEOUT, **kwargs)
+
+
+def close_sessions() -> None:
+    """Close all shared sessions and their pooled connections"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,267 @@
+"""
+Candle data access for Upstox historical data
+
+Reads are answered from the local candle store whenever it covers the
+requested range; otherwise only the missing tail is fetched through the
+shared response cache, rate limiter and pooled HTTP session, then merged
+into the store.
+"""
+
+import time
+from functools import partial
+from typing import Callable, Dict, Iterable, Optional, Union
+
+import numpy as np
+import requests
+
+import http_client
+from cache import get_api_cache
+from cache_backends import CacheEntry
+from candle_store import candle_store
+from config import get_api_headers, UPSTOX_BASE_URL, LTP_BATCH_SIZE
+from rate_limiter import upstox_limiter, parse_retry_after
+from resample import resample_candles
+
+
+def _rejects_instrument(resp: requests.Response) -> bool:
+    """Whether an error response rejects the instrument key itself rather than the request's range"""
+    try:
+        errors = resp.json().get('errors') or []
+    except ValueError:
+        return False
+    return any('instrument' in str(error.get('message', '')).lower()
+               for error in errors if isinstance(error, dict))
+
+
+def _upstox_get(url: str, label: str, max_retries: int, report_errors: bool,
+                headers: Optional[Dict[str, str]] = None, params: Optional[Dict[str, str]] = None,
+                on_error: Optional[Callable[[Union[requests.Response, Exception]], None]] = None) -> Optional[Dict]:
+    """
+    Rate-limited GET against the Upstox API, returning the JSON response or None
+
+    Every attempt takes a token from the shared limiter. 429s slow every
+    caller down and are retried; network errors back off this caller only
+    and are retried. Other failures return None at once.
+
+    Args:
+        url: Endpoint URL
+        label: What is being requested, for error messages
+        max_retries: Maximum number of attempts
+        report_errors: Print API errors
+        headers: Request headers (default: get_api_headers())
+        params: Query parameters
+        on_error: Called with the response of a failed (non-200) request,
+            or with the exception once network retries are exhausted
+    """
+    headers = headers or get_api_headers()
+
+    for attempt in range(max_retries):
+        try:
+            upstox_limiter.acquire()
+            resp = http_client.get(url, session='upstox', headers=headers, params=params)
+
+            if resp.status_code == 429:  # Rate limit: slow every caller down
+                upstox_limiter.report_throttled(parse_retry_after(resp.headers))
+                continue
+
+            if resp.status_code != 200:
+                if report_errors:
+                    print(f"API error for {label}: {resp.status_code} - {resp.text}")
+                if on_error is not None:
+                    on_error(resp)
+                return None
+
+            upstox_limiter.report_success()
+            rjson = resp.json()
+
+            if rjson.get("status") != "success":
+                if report_errors:
+                    print(f"API status error for {label}: {rjson.get('status')}")
+                return None
+
+            return rjson
+
+        except requests.exceptions.RequestException as e:
+            if report_errors:
+                print(f"Request error for {label}: {e}")
+            if attempt == max_retries - 1:
+                if on_error is not None:
+                    on_error(e)
+                return None
+            time.sleep(2 ** attempt)  # Network trouble, not throttling: back off this caller only
+        except Exception as e:
+            if report_errors:
+                print(f"Unexpected error for {label}: {e}")
+            return None
+
+    return None
+
+
+def _record_candle_failure(instkey: str, failure: Union[requests.Response, Exception]) -> None:
+    """
+    Record a failed historical-candle request as a negative cache entry
+
+    Failures that are about the instrument (an invalid instrument key) or
+    the service (server and network errors, briefly) are recorded so the
+    instrument is skipped until they expire. Other errors, such as a
+    rejected date range, may not recur for another range and are not
+    recorded.
+    """
+    if isinstance(failure, Exception):
+        get_api_cache().set_negative(instkey, f"request error: {type(failure).__name__}", transient=True)
+    elif failure.status_code >= 500:
+        get_api_cache().set_negative(instkey, f"HTTP {failure.status_code}", transient=True)
+    elif failure.status_code not in (401, 403) and _rejects_instrument(failure):
+        get_api_cache().set_negative(instkey, f"HTTP {failure.status_code}: invalid instrument")
+
+
+def _request_candles(url: str, instkey: str, max_retries: int, report_errors: bool) -> Optional[Dict]:
+    """Request a historical-candle URL, returning the JSON response or None"""
+    return _upstox_get(url, instkey, max_retries, report_errors,
+                       on_error=partial(_record_candle_failure, instkey))
+
+
+def _fetch_candle_entry(instkey: str, interval: str, start_date: str, end_date: str,
+                        max_retries: int, report_errors: bool,
+                        allow_stale: Optional[bool]) -> Optional[CacheEntry]:
+    """Get the cache entry for a historical-candle request, fetching it on a miss"""
+    url = f"{UPSTOX_BASE_URL}/historical-candle/{instkey}/{interval}/{end_date}/{start_date}"
+
+    # Create cache key parameters
+    cache_params = {
+        'instkey': instkey,
+        'start_date': start_date,
+        'end_date': end_date,
+        'interval': interval
+    }
+
+    fetcher = partial(_request_candles, url, instkey, max_retries, report_errors)
+    return get_api_cache().fetch(url, cache_params, fetcher, allow_stale=allow_stale)
+
+
+def get_candles(instkey: str, interval: str, start_date: str, end_date: str,
+                max_retries: int = 3, report_errors: bool = True,
+                incremental: bool = True, allow_stale: Optional[bool] = None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Get candles for a date range, from local storage when possible
+
+    Args:
+        instkey: Upstox instrument key
+        interval: Candle interval ('day', 'week', 'month')
+        start_date: Range start (YYYY-MM-DD)
+        end_date: Range end (YYYY-MM-DD)
+        max_retries: Maximum number of API retries
+        report_errors: Print API errors
+        incremental: Fetch only the bars newer than what is stored
+        allow_stale: Accept an expired cached response while it is refreshed
+
+    Returns:
+        Dict of column arrays sorted oldest first, or None if unavailable
+        (including uncovered ranges of instruments with a live negative
+        cache entry)
+    """
+    api_cache = get_api_cache()
+    max_age = api_cache.policy.interval_ttl(interval)
+    if not candle_store.covers(instkey, interval, start_date, end_date, max_age):
+        # A recent failure only matters when the store cannot answer on its own
+        failure = api_cache.get_negative(instkey)
+        if failure is not None:
+            if report_errors:
+                print(f"Skipping {instkey}: recent failure ({failure})")
+            return None
+
+        fetch_start = start_date
+        if incremental:
+            fetch_start = candle_store.sync_start(instkey, interval, start_date, end_date)
+
+        entry = _fetch_candle_entry(instkey, interval, fetch_start, end_date,
+                                    max_retries, report_errors, allow_stale)
+        if entry is None:
+            return None
+        candles = entry.response.get("data", {}).get("candles", [])
+        # A stale response keeps its original sync time so it is refetched soon
+        candle_store.write(instkey, interval, candles, fetch_start, end_date, synced_at=entry.timestamp)
+
+    return candle_store.read(instkey, interval, start_date, end_date)
+
+
+def get_bars(instkey: str, interval: str, start_date: str, end_date: str,
+             max_retries: int = 3, report_errors: bool = True,
+             allow_stale: Optional[bool] = None) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Get bars of any interval derived from the instrument's daily candles
+
+    Only daily candles are ever downloaded; weekly and monthly bars are
+    resampled locally, so every strategy and price lookup shares one
+    data source per instrument.
+
+    Args:
+        instkey: Upstox instrument key
+        interval: Bar interval ('day', 'week', 'month')
+        start_date: Range start (YYYY-MM-DD)
+        end_date: Range end (YYYY-MM-DD)
+        max_retries: Maximum number of API retries
+        report_errors: Print API errors
+        allow_stale: Accept an expired cached response while it is refreshed
+
+    Returns:
+        Dict of column arrays sorted oldest first, or None if unavailable
+    """
+    daily = get_candles(instkey, 'day', start_date, end_date, max_retries, report_errors,
+                        allow_stale=allow_stale)
+    if daily is None:
+        return None
+    return resample_candles(daily, interval)
+
+
+def _fetch_ltp_batch(url: str, params: Dict[str, str], headers: Dict[str, str],
+                     max_retries: int, report_errors: bool) -> Optional[Dict]:
+    """Request one batch of last traded prices, returning the JSON response or None"""
+    return _upstox_get(url, "LTP batch", max_retries, report_errors, headers=headers, params=params)
+
+
+def fetch_ltp(instkeys: Iterable[str], batch_size: Optional[int] = None,
+              max_retries: int = 3, report_errors: bool = True,
+              allow_stale: Optional[bool] = None) -> Dict[str, float]:
+    """
+    Fetch last traded prices for many instruments via the market-quote endpoint
+
+    Up to batch_size instrument keys are priced per request; responses
+    are cached for the policy's short 'quote' TTL. Instruments missing
+    from the response (or in a failed batch) are simply absent from the
+    result so callers can fall back to candle data.
+
+    Args:
+        instkeys: Upstox instrument keys
+        batch_size: Instruments per request (default: LTP_BATCH_SIZE)
+        max_retries: Maximum number of API retries per batch
+        report_errors: Print API errors
+        allow_stale: Accept expired cached quotes while they are refreshed
+            (pass False when the prices size real orders)
+
+    Returns:
+        Dict mapping instrument key to last traded price
+    """
+    keys = list(dict.fromkeys(instkeys))
+    batch_size = batch_size or LTP_BATCH_SIZE
+    url = f"{UPSTOX_BASE_URL}/market-quote/ltp"
+    headers = get_api_headers()
+    prices = {}
+
+    for i in range(0, len(keys), batch_size):
+        batch = keys[i:i + batch_size]
+        params = {'instrument_key': ','.join(batch)}
+        fetcher = partial(_fetch_ltp_batch, url, params, headers, max_retries, report_errors)
+        entry = get_api_cache().fetch(url, params, fetcher, allow_stale=allow_stale)
+        if entry is None:
+            continue
+        rjson = entry.response
+
+        # Response is keyed by exchange:symbol; map back via instrument_token
+        for quote in (rjson.get("data") or {}).values():
+            instkey = quote.get("instrument_token")
+            last_price = quote.get("last_price")
+            if instkey and last_price:
+                prices[instkey] = float(last_price)
+
+    return prices
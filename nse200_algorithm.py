@@ -28,7 +28,9 @@ from utils import (
     print_top_performers,
     clear_api_cache,
     print_cache_stats,
-    cleanup_expired_cache
+    cleanup_expired_cache,
+    compact_api_cache,
+    enable_stale_while_revalidate
 )
 
 
@@ -162,6 +164,12 @@ The algorithm will:
         help='Show cache statistics and exit'
     )
     
+    parser.add_argument(
+        '--compact-cache',
+        action='store_true',
+        help='Evict entries over the disk quota, rewrite cache storage and exit'
+    )
+    
     parser.add_argument(
         '--extra-money',
         type=float,
@@ -181,6 +189,11 @@ The algorithm will:
         print_cache_stats()
         return
     
+    if args.compact_cache:
+        reclaimed = compact_api_cache()
+        print(f"Compacted cache, reclaimed {reclaimed / 1024:,.1f} KB")
+        return
+    
     if args.clear_cache:
         cleared = clear_api_cache()
         print(f"Cleared {cleared} cache files")
@@ -189,12 +202,14 @@ The algorithm will:
     
     # Require strategy for actual algorithm execution
     if not args.strategy and not (args.cache_stats or args.clear_cache):
-        parser.error("--strategy is required unless using --cache-stats or --clear-cache")
+        parser.error("--strategy is required unless using --cache-stats, --compact-cache or --clear-cache")
     
     if args.strategy:
         if args.dry_run:
             print("DRY RUN MODE - No files will be modified")
             print()
+            # Previews may use recently expired data; it is refreshed in the background
+            enable_stale_while_revalidate()
         
         # Clean up expired cache files before running
         cleanup_expired_cache()
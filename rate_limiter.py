@@ -0,0 +1,190 @@
+"""
+Shared token-bucket rate limiter for Upstox API calls
+
+Bucket state lives in a small file guarded by an advisory lock, so every
+process on the machine (CLI, backtester, notebooks) draws from the same
+budget. On platforms without fcntl the limiter is thread-safe but
+process-local.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to per-process limiting
+    fcntl = None
+
+from config import UPSTOX_RATE_PER_SECOND, UPSTOX_RATE_PER_MINUTE
+
+
+class RateLimiter:
+    """
+    Dual token bucket (per-second and per-minute) with adaptive backoff on 429s
+    """
+
+    MIN_RATE_FACTOR = 0.1
+    RECOVERY_STEP = 0.02
+
+    def __init__(self, per_second: float, per_minute: float, state_file: Optional[str] = None):
+        """
+        Initialize the rate limiter
+
+        Args:
+            per_second: Sustained requests per second (also the burst size)
+            per_minute: Requests per minute
+            state_file: File used to share bucket state across processes
+                        (None keeps state in this process only)
+        """
+        self.per_second = per_second
+        self.per_minute = per_minute
+        self.state_file = state_file if fcntl is not None else None
+        self._lock = threading.Lock()
+        self._state = self._initial_state()
+        self._last_rate_factor = 1.0  # Lets report_success skip file I/O at full rate
+
+    def _initial_state(self) -> Dict[str, Any]:
+        return {
+            'second_tokens': float(self.per_second),
+            'minute_tokens': float(self.per_minute),
+            'updated': time.time(),
+            'blocked_until': 0.0,
+            'rate_factor': 1.0,
+        }
+
+    def _open_state_file(self):
+        """Open the shared state file, creating its directory if needed"""
+        try:
+            return open(self.state_file, 'a+', encoding='utf-8')
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(self.state_file) or '.', exist_ok=True)
+            return open(self.state_file, 'a+', encoding='utf-8')
+
+    def _update(self, mutate) -> Any:
+        """Apply mutate(state, now) atomically across threads and processes"""
+        with self._lock:
+            if not self.state_file:
+                return mutate(self._state, time.time())
+
+            with self._open_state_file() as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = json.loads(f.read() or '{}')
+                    except json.JSONDecodeError:
+                        state = {}
+                    if not state:
+                        state = self._initial_state()
+
+                    result = mutate(state, time.time())
+
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(state, f, separators=(',', ':'))
+                    f.flush()
+                    return result
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state: Dict[str, Any], now: float) -> None:
+        elapsed = max(0.0, now - state['updated'])
+        factor = state['rate_factor']
+        state['second_tokens'] = min(
+            float(self.per_second),
+            state['second_tokens'] + elapsed * self.per_second * factor
+        )
+        state['minute_tokens'] = min(
+            float(self.per_minute),
+            state['minute_tokens'] + elapsed * self.per_minute * factor / 60
+        )
+        state['updated'] = now
+
+    def _try_take(self, state: Dict[str, Any], now: float) -> float:
+        """Take one token if available; otherwise return seconds to wait"""
+        self._refill(state, now)
+        self._last_rate_factor = state['rate_factor']
+
+        if now < state['blocked_until']:
+            return state['blocked_until'] - now
+
+        if state['second_tokens'] >= 1 and state['minute_tokens'] >= 1:
+            state['second_tokens'] -= 1
+            state['minute_tokens'] -= 1
+            return 0.0
+
+        factor = state['rate_factor']
+        wait_second = (1 - state['second_tokens']) / (self.per_second * factor)
+        wait_minute = (1 - state['minute_tokens']) / (self.per_minute * factor / 60)
+        return max(wait_second, wait_minute, 0.0)
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent
+
+        Returns:
+            Total seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            wait = self._update(self._try_take)
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def report_throttled(self, retry_after: Optional[float] = None) -> None:
+        """
+        Record an HTTP 429: halve the rate and pause all callers
+
+        Args:
+            retry_after: Server-provided Retry-After in seconds, if any
+        """
+        def mutate(state, now):
+            self._refill(state, now)
+            state['rate_factor'] = max(self.MIN_RATE_FACTOR, state['rate_factor'] / 2)
+            pause = retry_after if retry_after else 1 / (self.per_second * state['rate_factor'])
+            state['blocked_until'] = max(state['blocked_until'], now + pause)
+            state['second_tokens'] = 0.0
+
+        self._update(mutate)
+
+    def report_success(self) -> None:
+        """Record a successful call, slowly restoring the full rate"""
+        if self._last_rate_factor >= 1.0:
+            return
+
+        def mutate(state, now):
+            if state['rate_factor'] < 1.0:
+                state['rate_factor'] = min(1.0, state['rate_factor'] + self.RECOVERY_STEP)
+            self._last_rate_factor = state['rate_factor']
+
+        self._update(mutate)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get a snapshot of the current bucket state"""
+        def mutate(state, now):
+            self._refill(state, now)
+            return dict(state)
+
+        return self._update(mutate)
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Extract Retry-After seconds from response headers, if present"""
+    value = headers.get('Retry-After') if headers else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# Global limiter shared by every Upstox call on this machine
+upstox_limiter = RateLimiter(
+    UPSTOX_RATE_PER_SECOND,
+    UPSTOX_RATE_PER_MINUTE,
+    state_file=os.path.join(".cache", "upstox_rate_limit.state")
+)
@@ -0,0 +1,63 @@
+"""
+Vectorized resampling of daily candles into weekly and monthly bars
+
+Bars are labelled the way Upstox labels them: weekly bars at the Monday
+and monthly bars at the first of the month, 00:00 IST.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+IST_OFFSET_SECONDS = 5 * 3600 + 1800
+
+
+def _period_starts(timestamps: np.ndarray, interval: str) -> np.ndarray:
+    """Map epoch-second timestamps to the epoch second their period starts (IST)"""
+    local_days = ((timestamps + IST_OFFSET_SECONDS) // 86400).astype('datetime64[D]')
+
+    if interval == 'month':
+        period_days = local_days.astype('datetime64[M]').astype('datetime64[D]')
+    elif interval == 'week':
+        # 1970-01-01 was a Thursday; shift so weeks start on Monday
+        day_numbers = local_days.astype(np.int64)
+        period_days = ((day_numbers + 3) // 7 * 7 - 3).astype('datetime64[D]')
+    else:
+        raise ValueError(f"Unsupported resample interval: {interval}")
+
+    return period_days.astype(np.int64) * 86400 - IST_OFFSET_SECONDS
+
+
+def resample_candles(daily: Dict[str, np.ndarray], interval: str) -> Dict[str, np.ndarray]:
+    """
+    Resample daily candles (sorted oldest first) into coarser bars
+
+    Args:
+        daily: Column arrays as returned by the candle store
+        interval: Target interval ('day', 'week' or 'month')
+
+    Returns:
+        Column arrays for the resampled bars, oldest first
+    """
+    if interval == 'day' or len(daily['timestamp']) == 0:
+        return daily
+
+    periods = _period_starts(daily['timestamp'], interval)
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    ends = np.r_[starts[1:], len(periods)] - 1
+
+    return {
+        'timestamp': periods[starts],
+        'open': daily['open'][starts],
+        'high': np.maximum.reduceat(daily['high'], starts),
+        'low': np.minimum.reduceat(daily['low'], starts),
+        'close': daily['close'][ends],
+        'volume': np.add.reduceat(daily['volume'], starts),
+        'oi': daily['oi'][ends],
+    }
+
+
+def latest_close(candles: Dict[str, np.ndarray]):
+    """Latest closing price from candles sorted oldest first, or None if empty"""
+    closes = candles['close']
+    return float(closes[-1]) if len(closes) > 0 else None
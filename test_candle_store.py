@@ -0,0 +1,67 @@
+"""
+Tests for CandleStore coverage and provisional-bar tracking
+
+Run with: python -m unittest test_candle_store
+"""
+
+import tempfile
+import time
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+import candle_store
+from candle_store import CandleStore
+
+INSTKEY = 'NSE_EQ|INE002A01018'
+
+
+def daily_candles(start_date: str, end_date: str):
+    """Upstox-style rows for every weekday in a range, newest first"""
+    day = date.fromisoformat(end_date)
+    candles = []
+    while day >= date.fromisoformat(start_date):
+        if day.weekday() < 5:
+            candles.append([f"{day.isoformat()}T00:00:00+05:30", 100.0, 101.0, 99.0, 100.0, 1000, 0])
+        day -= timedelta(days=1)
+    return candles
+
+
+class ProvisionalCarryOverTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.store = CandleStore(tmp.name)
+
+    def write(self, start_date: str, end_date: str, today: str, synced_at: float):
+        with mock.patch.object(candle_store, 'ist_today', return_value=today):
+            self.store.write(INSTKEY, 'day', daily_candles(start_date, end_date),
+                             start_date, end_date, synced_at=synced_at)
+
+    def test_non_touching_write_drops_old_provisional_marker(self):
+        stale = time.time() - 86400
+        self.write('2025-09-01', '2025-10-15', today='2025-10-15', synced_at=stale)
+        self.write('2025-11-20', '2025-11-24', today='2025-11-25', synced_at=time.time())
+
+        segment = self.store._load_segment(INSTKEY, 'day')
+        self.assertEqual([str(d) for d in segment['coverage']], ['2025-11-20', '2025-11-24'])
+        self.assertEqual(str(segment['provisional_from'][0]), '')
+
+        # Only the missing tail is fetched, and the closed bars stay covered
+        self.assertEqual(self.store.sync_start(INSTKEY, 'day', '2025-11-20', '2025-11-28'), '2025-11-25')
+        self.assertTrue(self.store.covers(INSTKEY, 'day', '2025-11-20', '2025-11-24', max_age_seconds=0))
+
+    def test_touching_write_keeps_unrefetched_provisional_marker(self):
+        stale = time.time() - 86400
+        self.write('2025-09-01', '2025-10-15', today='2025-10-15', synced_at=stale)
+        self.write('2025-09-15', '2025-10-10', today='2025-10-20', synced_at=time.time())
+
+        segment = self.store._load_segment(INSTKEY, 'day')
+        self.assertEqual(str(segment['provisional_from'][0]), '2025-10-15')
+        self.assertEqual(float(segment['synced_at'][0]), stale)
+        self.assertEqual(self.store.sync_start(INSTKEY, 'day', '2025-09-01', '2025-10-20'), '2025-10-15')
+
+
+if __name__ == '__main__':
+    unittest.main()
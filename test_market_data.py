@@ -0,0 +1,184 @@
+"""
+Tests for the batch LTP fetcher against a local stand-in for the Upstox API
+
+Run with: python -m unittest test_market_data
+"""
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, unquote, urlsplit
+
+os.environ['CACHE_METRICS_DUMP'] = '0'  # Keep run reports out of the working tree
+
+import cache
+import market_data
+from cache import APICache
+from candle_store import CandleStore
+from rate_limiter import upstox_limiter
+from universe import UniverseIndex
+from utils import PriceSnapshot
+
+SYMBOLS = [f"STOCK{i:02d}" for i in range(40)]
+INSTKEYS = {symbol: f"NSE_EQ|INE{i:03d}A01010" for i, symbol in enumerate(SYMBOLS)}
+POSITION = {instkey: i for i, instkey in enumerate(INSTKEYS.values())}
+
+
+def ltp_price(instkey: str) -> float:
+    return 100.0 + POSITION[instkey]
+
+
+def candle_close(instkey: str) -> float:
+    return 50.0 + POSITION[instkey]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves /market-quote/ltp and /historical-candle/... like Upstox does"""
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        self.server.requests.append(path)
+
+        if path == '/market-quote/ltp' and self.server.ltp_failure == 'server':
+            self.send_error(503)
+        elif path == '/market-quote/ltp' and self.server.ltp_failure == 'status':
+            self._reply({'status': 'error', 'errors': [{'message': 'Quotes unavailable'}]})
+        elif path == '/market-quote/ltp':
+            keys = parse_qs(parts.query)['instrument_key'][0].split(',')
+            data = {
+                f"NSE_EQ:{key}": {'instrument_token': key, 'last_price': ltp_price(key)}
+                for key in keys if key not in self.server.omitted
+            }
+            self._reply({'status': 'success', 'data': data})
+        elif path.startswith('/historical-candle/'):
+            instkey, interval, end_date, start_date = path.split('/')[2:6]
+            day = date.fromisoformat(end_date)
+            candles = []
+            while day >= date.fromisoformat(start_date):
+                if day.weekday() < 5:
+                    price = candle_close(instkey)
+                    candles.append([f"{day.isoformat()}T00:00:00+05:30", price, price, price, price, 1000, 0])
+                day -= timedelta(days=1)
+            self._reply({'status': 'success', 'data': {'candles': candles}})
+        else:
+            self.send_error(404)
+
+    def _reply(self, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServerTest(unittest.TestCase):
+    """Points market_data at a local server with an isolated cache and candle store"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        cls.server.requests = []
+        cls.server.omitted = set()
+        cls.server.ltp_failure = None  # 'server' (503) or 'status' (status != success)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.server.omitted = set()
+        self.server.ltp_failure = None
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        for patcher in (
+            mock.patch.object(market_data, 'UPSTOX_BASE_URL', base_url),
+            mock.patch.object(market_data, 'candle_store', CandleStore(os.path.join(tmp.name, '.candles'))),
+            mock.patch.object(cache, '_api_cache', APICache(cache_dir=os.path.join(tmp.name, '.cache'))),
+            mock.patch.object(upstox_limiter, 'state_file', None),
+            mock.patch.dict(os.environ, {'UPSTOX_API_TOKEN': 'test-token', 'NO_PROXY': '127.0.0.1'}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def requests_for(self, prefix: str):
+        return [path for path in self.server.requests if path.startswith(prefix)]
+
+
+class FetchLtpTest(StandInServerTest):
+
+    def test_batches_round_trips(self):
+        keys = list(INSTKEYS.values())
+        prices = market_data.fetch_ltp(keys, batch_size=16)
+
+        self.assertEqual(len(self.requests_for('/market-quote/ltp')), 3)  # 16 + 16 + 8
+        self.assertEqual(prices, {key: ltp_price(key) for key in keys})
+
+    def test_cached_batches_are_not_refetched(self):
+        keys = list(INSTKEYS.values())
+        market_data.fetch_ltp(keys, batch_size=16)
+        market_data.fetch_ltp(keys, batch_size=16)
+
+        self.assertEqual(len(self.requests_for('/market-quote/ltp')), 3)
+
+    def test_omitted_instruments_are_absent(self):
+        keys = list(INSTKEYS.values())
+        self.server.omitted = set(keys[:5])
+        prices = market_data.fetch_ltp(keys)
+
+        self.assertEqual(len(self.requests_for('/market-quote/ltp')), 1)
+        self.assertEqual(set(prices), set(keys[5:]))
+
+
+class PriceSnapshotTest(StandInServerTest):
+
+    def test_omitted_symbols_fall_back_to_candles(self):
+        universe = UniverseIndex([(symbol, instkey, None) for symbol, instkey in INSTKEYS.items()])
+        omitted = SYMBOLS[:3]
+        self.server.omitted = {INSTKEYS[symbol] for symbol in omitted}
+
+        snapshot = PriceSnapshot.capture(SYMBOLS, universe)
+
+        self.assertEqual(len(self.requests_for('/market-quote/ltp')), 1)  # 40 symbols fit one batch
+        candle_requests = self.requests_for('/historical-candle/')
+        self.assertEqual({path.split('/')[2] for path in candle_requests}, self.server.omitted)
+        for symbol in SYMBOLS:
+            expected = candle_close if symbol in omitted else ltp_price
+            self.assertEqual(snapshot.get(symbol), expected(INSTKEYS[symbol]))
+
+    def assert_priced_from_candles(self, ltp_failure: str):
+        universe = UniverseIndex([(symbol, instkey, None) for symbol, instkey in INSTKEYS.items()])
+        self.server.ltp_failure = ltp_failure
+
+        snapshot = PriceSnapshot.capture(SYMBOLS, universe)
+
+        self.assertTrue(self.requests_for('/market-quote/ltp'))
+        candle_requests = self.requests_for('/historical-candle/')
+        self.assertEqual({path.split('/')[2] for path in candle_requests}, set(INSTKEYS.values()))
+        for symbol in SYMBOLS:
+            self.assertEqual(snapshot.get(symbol), candle_close(INSTKEYS[symbol]))
+
+    def test_ltp_server_error_falls_back_to_candles(self):
+        self.assert_priced_from_candles('server')
+
+    def test_ltp_error_status_falls_back_to_candles(self):
+        self.assert_priced_from_candles('status')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+Symbol / instrument key / ISIN index for the NSE 200 universe
+
+The source xlsx is parsed with openpyxl only when it changes; otherwise a
+pickled snapshot (or the copy already held in memory) is reused.
+"""
+
+import math
+import os
+import pickle
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SNAPSHOT_DIR = ".cache"
+
+_memory = {}  # absolute source path -> (signature, DataFrame, UniverseIndex or None)
+_memory_lock = threading.Lock()
+
+
+def _clean(value) -> Optional[str]:
+    """Normalize a spreadsheet cell to a stripped string or None"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+class UniverseIndex:
+    """
+    O(1) lookups between symbols, Upstox instrument keys and ISINs
+
+    Built once from the NSE 200 list; symbol order follows the source file.
+    """
+
+    def __init__(self, rows: List[Tuple[str, str, Optional[str]]]):
+        """
+        Initialize the index
+
+        Args:
+            rows: (symbol, instrument_key, isin) tuples in universe order
+        """
+        self._symbols: List[str] = []
+        self._instkey_by_symbol: Dict[str, str] = {}
+        self._symbol_by_instkey: Dict[str, str] = {}
+        self._isin_by_symbol: Dict[str, str] = {}
+        self._symbol_by_isin: Dict[str, str] = {}
+
+        for symbol, instkey, isin in rows:
+            if symbol not in self._instkey_by_symbol:
+                self._symbols.append(symbol)
+            self._instkey_by_symbol[symbol] = instkey
+            self._symbol_by_instkey[instkey] = symbol
+            if isin:
+                self._isin_by_symbol[symbol] = isin
+                self._symbol_by_isin[isin] = symbol
+
+    @classmethod
+    def from_dataframe(cls, df) -> 'UniverseIndex':
+        """
+        Build an index from the NSE 200 DataFrame
+
+        ISINs come from the 'ISIN Code' column, or from the instrument key
+        (NSE_EQ|<ISIN>) where that column is empty.
+        """
+        isin_column = df['ISIN Code'] if 'ISIN Code' in df.columns else [None] * len(df)
+        rows = []
+        for symbol, instkey, isin in zip(df['Symbol'], df['instrument_key'], isin_column):
+            symbol, instkey = _clean(symbol), _clean(instkey)
+            if not symbol or not instkey:
+                continue
+            isin = _clean(isin) or (instkey.split('|', 1)[1] if '|' in instkey else None)
+            rows.append((symbol, instkey, isin))
+        return cls(rows)
+
+    @classmethod
+    def coerce(cls, universe) -> 'UniverseIndex':
+        """Return universe as an index, building one if given a DataFrame"""
+        return universe if isinstance(universe, cls) else cls.from_dataframe(universe)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._instkey_by_symbol
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._symbols)
+
+    @property
+    def symbols(self) -> List[str]:
+        """Symbols in universe order"""
+        return list(self._symbols)
+
+    def items(self) -> List[Tuple[str, str]]:
+        """(symbol, instrument_key) pairs in universe order"""
+        return [(symbol, self._instkey_by_symbol[symbol]) for symbol in self._symbols]
+
+    def instrument_key(self, symbol: str) -> Optional[str]:
+        """Get the Upstox instrument key for a symbol"""
+        return self._instkey_by_symbol.get(symbol)
+
+    def symbol_for(self, instkey: str) -> Optional[str]:
+        """Get the symbol for an Upstox instrument key"""
+        return self._symbol_by_instkey.get(instkey)
+
+    def isin(self, symbol: str) -> Optional[str]:
+        """Get the ISIN for a symbol"""
+        return self._isin_by_symbol.get(symbol)
+
+    def symbol_for_isin(self, isin: str) -> Optional[str]:
+        """Get the symbol for an ISIN"""
+        return self._symbol_by_isin.get(isin)
+
+
+def _source_signature(path: str) -> Tuple[int, int]:
+    """Identify a version of the source file by mtime and size"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _snapshot_path(path: str, snapshot_dir: str) -> str:
+    return os.path.join(snapshot_dir, f"{os.path.basename(path)}.pkl")
+
+
+def load_universe_frame(path: str, snapshot_dir: str = SNAPSHOT_DIR):
+    """
+    Load the NSE 200 list as a DataFrame, avoiding repeated xlsx parsing
+
+    Args:
+        path: Path to the source xlsx file
+        snapshot_dir: Directory for the binary snapshot
+
+    Returns:
+        A copy of the universe DataFrame
+    """
+    key = os.path.abspath(path)
+    signature = _source_signature(path)
+
+    cached = _memory.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1].copy()
+
+    with _memory_lock:
+        df = None
+        snapshot_file = _snapshot_path(path, snapshot_dir)
+
+        try:
+            with open(snapshot_file, 'rb') as f:
+                snapshot_signature, snapshot_df = pickle.load(f)
+            if tuple(snapshot_signature) == signature:
+                df = snapshot_df
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError, ImportError):
+            pass
+
+        if df is None:
+            import pandas as pd
+            df = pd.read_excel(path)
+
+            try:
+                os.makedirs(snapshot_dir, exist_ok=True)
+                tmp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+                with open(tmp_file, 'wb') as f:
+                    pickle.dump((signature, df), f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_file, snapshot_file)
+            except OSError:
+                pass  # The snapshot is only an optimization
+
+        _memory[key] = (signature, df, None)
+        return df.copy()
+
+
+def load_universe(path: str, snapshot_dir: str = SNAPSHOT_DIR) -> UniverseIndex:
+    """
+    Load the NSE 200 list as a UniverseIndex, memoized per source version
+
+    Args:
+        path: Path to the source xlsx file
+        snapshot_dir: Directory for the binary snapshot
+
+    Returns:
+        UniverseIndex for the current version of the file
+    """
+    key = os.path.abspath(path)
+    signature = _source_signature(path)
+
+    cached = _memory.get(key)
+    if cached is not None and cached[0] == signature and cached[2] is not None:
+        return cached[2]
+
+    index = UniverseIndex.from_dataframe(load_universe_frame(path, snapshot_dir))
+    with _memory_lock:
+        cached = _memory.get(key)
+        if cached is not None and cached[0] == signature:
+            _memory[key] = (signature, cached[1], index)
+    return index
@@ -7,7 +7,6 @@ with Upstox instrument keys for use in the trading algorithm.
 """
 
 import pandas as pd
-import requests
 import json
 import time
 from datetime import datetime
@@ -15,6 +14,8 @@ from typing import List, Dict, Optional
 import argparse
 from pathlib import Path
 
+import http_client
+
 # Configuration
 NSE_NIFTY200_CSV_URL = "https://nsearchives.nseindia.com/content/indices/ind_nifty200list.csv"
 NSE_NIFTY200_BACKUP_URL = "https://www1.nseindia.com/content/indices/ind_nifty200list.csv"
@@ -24,9 +25,8 @@ BACKUP_DIR = "backups"
 
 class NSE200Updater:
     def __init__(self):
-        self.session = requests.Session()
         # Set headers to mimic browser request
-        self.session.headers.update({
+        self.session = http_client.create_session(headers={
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'application/json, text/plain, */*',
             'Accept-Language': 'en-US,en;q=0.9',
@@ -53,7 +53,7 @@ class NSE200Updater:
         for url in urls_to_try:
             try:
                 print(f"Trying: {url}")
-                response = requests.get(url, timeout=30)
+                response = http_client.get(url, timeout=30)
                 
                 if response.status_code == 200:
                     # Parse CSV content
@@ -96,7 +96,7 @@ class NSE200Updater:
             print("Fetching Upstox instrument master...")
             
             # Download the compressed CSV
-            response = requests.get(UPSTOX_INSTRUMENTS_URL, timeout=60)
+            response = http_client.get(UPSTOX_INSTRUMENTS_URL, timeout=60)
             if response.status_code != 200:
                 print(f"Upstox API returned status code: {response.status_code}")
                 return None
@@ -12,13 +12,14 @@ with automatic Upstox instrument key matching.
 """
 
 import pandas as pd
-import requests
 import argparse
 from pathlib import Path
 from datetime import datetime
 import gzip
 import io
 
+import http_client
+
 # Configuration
 UPSTOX_INSTRUMENTS_URL = "https://assets.upstox.com/market-quote/instruments/exchange/complete.csv.gz"
 OUTPUT_FILE = "ind_nifty200list.xlsx"
@@ -30,7 +31,7 @@ def fetch_upstox_instruments():
     print("Fetching Upstox instrument master...")
     
     try:
-        response = requests.get(UPSTOX_INSTRUMENTS_URL, timeout=60)
+        response = http_client.get(UPSTOX_INSTRUMENTS_URL, timeout=60)
         if response.status_code != 200:
             print(f"Upstox API returned status code: {response.status_code}")
             return None
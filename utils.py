@@ -1,15 +1,20 @@
 """
 Utility functions for NSE 200 winner algorithm
+
+Heavy modules (pandas, tqdm, and the market-data layer with requests and
+NumPy) are imported inside the functions that use them, so the cache
+commands start without loading them.
 """
 
-import pandas as pd
-import requests
 from datetime import datetime
-import time
-from typing import List, Dict, Optional, Tuple
-from tqdm import tqdm
-from config import get_api_headers, UPSTOX_BASE_URL, NSE200_FILE, PORTFOLIO_VALUE, CASH_RESERVE_PERCENTAGE
-from cache import api_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import MappingProxyType
+from typing import TYPE_CHECKING, List, Dict, Iterable, Optional, Tuple
+from config import NSE200_FILE, PORTFOLIO_VALUE, CASH_RESERVE_PERCENTAGE, MAX_CONCURRENT_REQUESTS
+from universe import UniverseIndex, load_universe, load_universe_frame
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def datesort(crow):
@@ -26,99 +31,51 @@ def get_returns(instkey: str, weeks: int, max_retries: int = 3) -> Optional[floa
         instkey: Upstox instrument key
         weeks: Number of weeks to calculate returns for
         max_retries: Maximum number of API retries
-    
+        
     Returns:
         Returns as decimal (e.g., 0.15 for 15%) or None if failed
     """
     from config import get_date_range
+    from market_data import get_bars
     
     start_date, end_date = get_date_range(weeks)
-    url = f"{UPSTOX_BASE_URL}/historical-candle/{instkey}/month/{end_date}/{start_date}"
-    
-    # Create cache key parameters
-    cache_params = {
-        'instkey': instkey,
-        'start_date': start_date,
-        'end_date': end_date,
-        'interval': 'month'
-    }
-    
-    # Try to get from cache first
-    cached_response = api_cache.get(url, cache_params)
-    if cached_response is not None:
-        # Process cached data
-        return _process_candle_data(cached_response, instkey)
-    
-    # Not in cache, make API request
-    headers = get_api_headers()
-    
-    for attempt in range(max_retries):
-        try:
-            resp = requests.get(url, headers=headers, timeout=30)
-            
-            if resp.status_code == 429:  # Rate limit
-                time.sleep(2 ** attempt)  # Exponential backoff
-                continue
-                
-            if resp.status_code != 200:
-                print(f"API error for {instkey}: {resp.status_code} - {resp.text}")
-                return None
-                
-            rjson = resp.json()
-            
-            if rjson.get("status") != "success":
-                print(f"API status error for {instkey}: {rjson.get('status')}")
-                return None
-            
-            # Cache the successful response
-            api_cache.set(url, rjson, cache_params)
-            
-            # Process the response
-            return _process_candle_data(rjson, instkey)
-            
-        except requests.exceptions.RequestException as e:
-            print(f"Request error for {instkey}: {e}")
-            if attempt == max_retries - 1:
-                return None
-            time.sleep(2 ** attempt)
-        except Exception as e:
-            print(f"Unexpected error for {instkey}: {e}")
-            return None
     
-    return None
+    # Monthly bars resampled from the locally stored daily candles
+    candles = get_bars(instkey, 'month', start_date, end_date, max_retries)
+    if candles is None:
+        return None
+    
+    return _returns_from_closes(candles['close'], instkey)
 
 
-def _process_candle_data(response_data: Dict, instkey: str) -> Optional[float]:
+def _returns_from_closes(closes, instkey: str) -> Optional[float]:
     """
-    Process candle data from API response to calculate returns
+    Calculate returns from a close-price series sorted oldest first
     
     Args:
-        response_data: The API response JSON
+        closes: Closing prices, oldest first
         instkey: Upstox instrument key (for error reporting)
-    
+        
     Returns:
         Returns as decimal or None if failed
     """
-    candles = response_data.get("data", {}).get("candles", [])
-    if not candles:
+    if len(closes) == 0:
         print(f"No candle data for {instkey}")
         return None
-        
-    candles.sort(key=datesort, reverse=True)
     
-    start_price = candles[-1][4]  # Closing price of earliest date
-    end_price = candles[0][4]     # Closing price of latest date
+    start_price = closes[0]   # Closing price of earliest date
+    end_price = closes[-1]    # Closing price of latest date
     
     if start_price == 0:
         return None
-        
-    return (end_price - start_price) / start_price
+    
+    return float((end_price - start_price) / start_price)
 
 
-def load_nse200_data() -> pd.DataFrame:
-    """Load NSE 200 stock data from Excel file"""
+def load_nse200_data() -> 'pd.DataFrame':
+    """Load NSE 200 stock data (xlsx parsed only when the file changes)"""
     try:
-        return pd.read_excel(NSE200_FILE)
+        return load_universe_frame(NSE200_FILE)
     except FileNotFoundError:
         print(f"Error: {NSE200_FILE} not found")
         raise
@@ -127,37 +84,68 @@ def load_nse200_data() -> pd.DataFrame:
         raise
 
 
-def calculate_returns_for_all_stocks(weeks: int) -> List[Dict[str, any]]:
+def load_universe_index() -> UniverseIndex:
+    """Load the NSE 200 list as a symbol/instrument key/ISIN index"""
+    try:
+        return load_universe(NSE200_FILE)
+    except FileNotFoundError:
+        print(f"Error: {NSE200_FILE} not found")
+        raise
+    except Exception as e:
+        print(f"Error loading NSE200 data: {e}")
+        raise
+
+
+def calculate_returns_for_all_stocks(weeks: int, max_workers: Optional[int] = None) -> List[Dict[str, any]]:
     """
     Calculate returns for all NSE 200 stocks
     
+    Candle requests are issued concurrently on a bounded thread pool; ranges
+    already in the local candle store return immediately and fresh candles
+    are merged into it by get_returns as usual.
+    
     Args:
         weeks: Number of weeks for return calculation
+        max_workers: Maximum concurrent requests (default: MAX_CONCURRENT_REQUESTS)
         
     Returns:
         List of dicts with symbol and gain/return data
     """
-    df = load_nse200_data()
-    sym_returns = {}
-    total_stocks = len(df)
+    universe = load_universe_index()
+    total_stocks = len(universe)
+    max_workers = max_workers or MAX_CONCURRENT_REQUESTS
     
     print(f"Calculating {weeks}-week returns for {total_stocks} stocks...")
     
+    stocks = universe.items()
+    results = {}
+    
     # Use tqdm for clean progress display
+    from tqdm import tqdm
     with tqdm(total=total_stocks, desc="Processing stocks", unit="stock") as pbar:
-        for idx, row in df.iterrows():
-            symbol = row['Symbol']
-            instkey = row['instrument_key']
-            
-            pbar.set_description(f"Processing {symbol}")
-            
-            returns = get_returns(instkey, weeks)
-            sym_returns[symbol] = returns if returns is not None else 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(get_returns, instkey, weeks): symbol
+                for symbol, instkey in stocks
+            }
             
-            pbar.update(1)
-            
-            # Small delay to avoid rate limiting
-            time.sleep(0.05)  # Reduced delay since cache is faster now
+            for future in as_completed(futures):
+                symbol = futures[future]
+                pbar.set_description(f"Processed {symbol}")
+                
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    print(f"Unexpected error for {symbol}: {e}")
+                    results[symbol] = None
+                
+                pbar.update(1)
+    
+    # Rebuild in universe order so ties sort exactly as the serial version did
+    sym_returns = {}
+    for symbol, _ in stocks:
+        returns = results.get(symbol)
+        sym_returns[symbol] = returns if returns is not None else 0
     
     print("\nSorting stocks by performance...")
     
@@ -169,8 +157,9 @@ def calculate_returns_for_all_stocks(weeks: int) -> List[Dict[str, any]]:
     return sorted_returns
 
 
-def load_current_portfolio(portfolio_file: str) -> pd.DataFrame:
+def load_current_portfolio(portfolio_file: str) -> 'pd.DataFrame':
     """Load current portfolio from CSV file"""
+    import pandas as pd
     try:
         return pd.read_csv(portfolio_file)
     except FileNotFoundError:
@@ -183,7 +172,7 @@ def load_current_portfolio(portfolio_file: str) -> pd.DataFrame:
         raise
 
 
-def calculate_portfolio_changes(current_portfolio: pd.DataFrame, 
+def calculate_portfolio_changes(current_portfolio: 'pd.DataFrame', 
                               top_40: List[Dict], 
                               top_20: List[Dict]) -> Tuple[List[str], List[str], List[str]]:
     """
@@ -223,15 +212,92 @@ def calculate_portfolio_changes(current_portfolio: pd.DataFrame,
     return buy, sell, hold
 
 
-def smart_allocate_cash(buy_list: List[str], nse200_df: pd.DataFrame, available_cash: float, debug: bool = False) -> Dict[str, float]:
+class PriceSnapshot:
+    """
+    Frozen symbol -> price map shared by every step of one portfolio run
+    
+    Each price is fetched once, up front, so allocation, buying, selling and
+    redistribution all see the same numbers.
+    """
+    
+    def __init__(self, prices: Dict[str, Optional[float]]):
+        self._prices = MappingProxyType(dict(prices))
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._prices
+    
+    def __len__(self) -> int:
+        return len(self._prices)
+    
+    def get(self, symbol: str) -> Optional[float]:
+        """Get the frozen price for a symbol (None if unavailable)"""
+        return self._prices.get(symbol)
+    
+    @classmethod
+    def capture(cls, symbols: Iterable[str], universe: UniverseIndex, debug: bool = False,
+                max_workers: Optional[int] = None, use_quotes: bool = True,
+                allow_stale: bool = False) -> 'PriceSnapshot':
+        """
+        Fetch current prices for the given symbols in bulk and freeze them
+        
+        Prices come from the batch LTP endpoint first; anything it misses is
+        priced concurrently from candle data.
+        
+        Args:
+            symbols: Symbols to price (duplicates and CASH are ignored)
+            universe: NSE 200 universe index (a DataFrame is also accepted)
+            debug: Enable debug output for price fetching
+            max_workers: Maximum concurrent requests (default: MAX_CONCURRENT_REQUESTS)
+            use_quotes: Try the batch LTP endpoint before candle data
+            allow_stale: Accept stale cached prices (orders are sized from
+                these, so by default they are always fresh)
+                
+        Returns:
+            PriceSnapshot with a price (or None) for every known symbol
+        """
+        universe = UniverseIndex.coerce(universe)
+        instkeys = {s: universe.instrument_key(s) for s in dict.fromkeys(symbols) if s != 'CASH' and s in universe}
+        wanted = list(instkeys)
+        
+        prices = {}
+        if use_quotes and wanted:
+            from market_data import fetch_ltp
+            quotes = fetch_ltp([instkeys[symbol] for symbol in wanted], report_errors=debug,
+                               allow_stale=allow_stale)
+            for symbol in wanted:
+                if instkeys[symbol] in quotes:
+                    prices[symbol] = quotes[instkeys[symbol]]
+            if debug:
+                print(f"Batch LTP priced {len(prices)}/{len(wanted)} symbols")
+        
+        missing = [symbol for symbol in wanted if symbol not in prices]
+        with ThreadPoolExecutor(max_workers=max_workers or MAX_CONCURRENT_REQUESTS) as executor:
+            futures = {
+                executor.submit(get_current_price, instkeys[symbol], debug=debug,
+                                allow_stale=allow_stale): symbol
+                for symbol in missing
+            }
+            for future in as_completed(futures):
+                try:
+                    prices[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Price fetch failed for {futures[future]}: {e}")
+                    prices[futures[future]] = None
+        
+        return cls(prices)
+
+
+def smart_allocate_cash(buy_list: List[str], universe: UniverseIndex, available_cash: float, debug: bool = False,
+                        prices: Optional[PriceSnapshot] = None) -> Dict[str, float]:
     """
     Smart cash allocation that prioritizes top performers and handles expensive stocks
     
     Args:
         buy_list: List of symbols to buy (in priority order - best performers first)
-        nse200_df: NSE200 data with instrument keys
+        universe: NSE 200 universe index (a DataFrame is also accepted)
         available_cash: Total cash available for investment
         debug: Enable debug output
+        prices: Run-scoped price snapshot
         
     Returns:
         Dict mapping symbol to allocation amount
@@ -243,11 +309,11 @@ def smart_allocate_cash(buy_list: List[str], nse200_df: pd.DataFrame, available_
     stock_prices = {}
     min_allocation = available_cash * 0.02  # Minimum 2% allocation per stock
     
+    universe = UniverseIndex.coerce(universe)
     for symbol in buy_list:
-        nse_row = nse200_df[nse200_df['Symbol'] == symbol]
-        if not nse_row.empty:
-            instkey = nse_row.iloc[0]['instrument_key']
-            units, price = calculate_units_to_buy(symbol, instkey, min_allocation, use_fallback=True, debug=False)
+        instkey = universe.instrument_key(symbol)
+        if instkey:
+            units, price = calculate_units_to_buy(symbol, instkey, min_allocation, use_fallback=True, debug=False, prices=prices)
             if price > 0:
                 stock_prices[symbol] = price
     
@@ -323,8 +389,15 @@ def update_portfolio(portfolio_file: str, buy_list: List[str], sell_list: List[s
         extra_money: Additional money to invest (default: 0)
         debug_prices: Enable debug output for price fetching
     """
+    import pandas as pd
+    from tqdm import tqdm
+    
     df = load_current_portfolio(portfolio_file)
-    nse200_df = load_nse200_data()
+    universe = load_universe_index()
+    
+    # Fetch every price this run needs once, up front, and reuse it everywhere
+    needed_symbols = list(sell_list) + list(buy_list) + list(df['Symbol'].values)
+    prices = PriceSnapshot.capture(needed_symbols, universe, debug=debug_prices)
     
     # Get existing cash position
     existing_cash = 0
@@ -339,11 +412,8 @@ def update_portfolio(portfolio_file: str, buy_list: List[str], sell_list: List[s
         if not symbol_row.empty:
             units = float(symbol_row.iloc[0]['Units'])
             if units > 0:
-                # Find instrument key
-                nse_row = nse200_df[nse200_df['Symbol'] == symbol]
-                if not nse_row.empty:
-                    instkey = nse_row.iloc[0]['instrument_key']
-                    current_price = get_current_price(instkey, debug=debug_prices)
+                if symbol in universe:
+                    current_price = prices.get(symbol)
                     if current_price:
                         proceeds = units * current_price
                         sell_proceeds += proceeds
@@ -375,7 +445,7 @@ def update_portfolio(portfolio_file: str, buy_list: List[str], sell_list: List[s
     # Smart allocation based on priority and stock prices
     if buy_list:
         print(f"\nCalculating smart allocation for {len(buy_list)} stocks...")
-        allocations = smart_allocate_cash(buy_list, nse200_df, available_cash, debug=debug_prices)
+        allocations = smart_allocate_cash(buy_list, universe, available_cash, debug=debug_prices, prices=prices)
         print(f"Smart allocation completed")
     else:
         allocations = {}
@@ -395,16 +465,14 @@ def update_portfolio(portfolio_file: str, buy_list: List[str], sell_list: List[s
             if debug_prices:
                 print(f"No allocation for {symbol}, skipping")
             continue
-            
+        
         allocation_amount = allocations[symbol]
         
         # Find instrument key
-        nse_row = nse200_df[nse200_df['Symbol'] == symbol]
-        if nse_row.empty:
+        instkey = universe.instrument_key(symbol)
+        if instkey is None:
             print(f"Warning: {symbol} not found in NSE200 data, skipping")
             continue
-            
-        instkey = nse_row.iloc[0]['instrument_key']
         
         if debug_prices:
             print(f"Processing {symbol} with allocation ₹{allocation_amount:.2f}...")
@@ -413,7 +481,7 @@ def update_portfolio(portfolio_file: str, buy_list: List[str], sell_list: List[s
         
         # Get units and price in one call to avoid redundant API requests
         units_to_buy, current_price = calculate_units_to_buy(
-            symbol, instkey, allocation_amount, use_fallback=True, debug=debug_prices
+            symbol, instkey, allocation_amount, use_fallback=True, debug=debug_prices, prices=prices
         )
         
         if units_to_buy > 0 and current_price > 0:
@@ -446,7 +514,7 @@ def update_portfolio(portfolio_file: str, buy_list: List[str], sell_list: List[s
     # Redistribute remaining cash to minimize leftover cash
     if remaining_cash > 1000:
         print("Redistributing remaining cash...")
-    df, final_remaining_cash = redistribute_remaining_cash(df, nse200_df, remaining_cash)
+    df, final_remaining_cash = redistribute_remaining_cash(df, universe, remaining_cash, prices=prices)
     
     # Update cash position with final remaining amount
     cash_row = df[df['Symbol'] == 'CASH']
@@ -505,27 +573,64 @@ def print_top_performers(sorted_stocks: List[Dict], top_n: int = 20) -> None:
 
 def clear_api_cache() -> int:
     """
-    Clear all cached API data
+    Clear all cached API data, including the local candle store
     
     Returns:
         Number of cache files removed
     """
     from cache import api_cache
-    return api_cache.clear_all()
+    from candle_store import candle_store
+    return api_cache.clear_all() + candle_store.clear_all()
 
 
 def print_cache_stats() -> None:
     """Print cache statistics"""
     from cache import api_cache
+    from cache_metrics import format_metrics, load_last_run_metrics, metrics_dir
     stats = api_cache.get_cache_stats()
     
     print("\nAPI CACHE STATISTICS:")
     print("-" * 30)
-    print(f"Cache directory: {stats['cache_dir']}")
+    print(f"Cache directory: {stats['cache_dir']} ({stats.get('backend', 'file')} backend)")
     print(f"TTL (hours): {stats['ttl_hours']}")
+    interval_ttls = stats.get('interval_ttls')
+    if interval_ttls:
+        print("Open-range TTLs: " + ", ".join(f"{name} {ttl}s" for name, ttl in interval_ttls.items()))
     print(f"Total files: {stats['total_files']}")
     print(f"Valid files: {stats['valid_files']}")
+    print(f"Immutable files: {stats.get('immutable_files', 0)}")
     print(f"Expired files: {stats['expired_files']}")
+    print(f"Total size: {stats.get('total_bytes', 0) / 1024:,.1f} KB")
+    if stats.get('quota_bytes'):
+        print(f"Disk quota: {stats['quota_bytes'] / 1024 / 1024:,.0f} MB ({stats['eviction_policy'].upper()} eviction)")
+    
+    negatives = stats.get('negative_entries')
+    if negatives:
+        print(f"Negative entries: {len(negatives)} instruments skipped until their entries expire")
+        for instkey, info in sorted(negatives.items()):
+            print(f"  {instkey}: {info['reason']} (expires in {int(info['expires_in'] / 60)} min)")
+    
+    memory = stats.get('memory')
+    if memory:
+        print(f"Memory tier: {memory['entries']}/{memory['max_entries']} entries, "
+              f"{memory['bytes'] / 1024:,.1f}/{memory['max_bytes'] / 1024:,.0f} KB, "
+              f"{memory['evictions']} evictions")
+    
+    metrics = stats.get('metrics')
+    if metrics and metrics['lookups'] == 0:
+        # Nothing looked up in this process (e.g. --cache-stats): show the last run instead
+        metrics = load_last_run_metrics(metrics_dir(stats['cache_dir']))
+    if metrics:
+        if 'path' in metrics:
+            finished = datetime.fromtimestamp(metrics['finished_at']).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"\nCACHE INSTRUMENTATION (run finished {finished}):")
+        else:
+            print("\nCACHE INSTRUMENTATION (this run):")
+        print("-" * 30)
+        for line in format_metrics(metrics):
+            print(line)
+        if 'path' in metrics:
+            print(f"Full report: {metrics['path']}")
     
     if stats['expired_files'] > 0:
         print(f"\nRun with --clear-cache to remove expired files")
@@ -542,7 +647,26 @@ def cleanup_expired_cache() -> int:
     return api_cache.clear_expired()
 
 
-def get_current_price(instkey: str, max_retries: int = 3, debug: bool = False) -> Optional[float]:
+def compact_api_cache() -> int:
+    """
+    Evict cache entries over the disk quota and rewrite fragmented storage
+    
+    Returns:
+        Number of bytes reclaimed
+    """
+    from cache import api_cache
+    api_cache.clear_expired()
+    return api_cache.compact()
+
+
+def enable_stale_while_revalidate() -> None:
+    """Serve expired cache entries immediately and refresh them in the background"""
+    from cache import api_cache
+    api_cache.stale_while_revalidate = True
+
+
+def get_current_price(instkey: str, max_retries: int = 3, debug: bool = False,
+                      allow_stale: Optional[bool] = None) -> Optional[float]:
     """
     Get current price for a stock with multiple fallback strategies
     
@@ -550,75 +674,42 @@ def get_current_price(instkey: str, max_retries: int = 3, debug: bool = False) -
         instkey: Upstox instrument key
         max_retries: Maximum number of API retries per strategy
         debug: Enable debug output
-    
+        allow_stale: Accept stale cached candles (default: the cache's setting)
+        
     Returns:
         Current price or None if all strategies failed
     """
     from datetime import date, timedelta
+    from market_data import get_bars
+    from resample import latest_close
     
-    # Strategy 1: Try daily data for last 10 days (handles weekends/holidays)
+    # Strategy 1: Try daily data for last 10 days (handles weekends/holidays).
+    # All windows read the same stored daily series, so once the ranking run
+    # has synced an instrument these are answered locally.
     strategies = [
-        {"interval": "day", "days_back": 10, "description": "Daily data (10 days)"},
-        {"interval": "day", "days_back": 30, "description": "Daily data (30 days)"},
-        {"interval": "month", "days_back": 90, "description": "Monthly data (90 days)"},
+        {"days_back": 10, "description": "Daily data (10 days)"},
+        {"days_back": 30, "description": "Daily data (30 days)"},
+        {"days_back": 90, "description": "Daily data (90 days)"},
     ]
     
-    headers = get_api_headers()
-    
     for strategy in strategies:
         if debug:
             print(f"  Trying {strategy['description']} for {instkey}")
         
         end_date = str(date.today())
         start_date = str(date.today() - timedelta(days=strategy['days_back']))
-        url = f"{UPSTOX_BASE_URL}/historical-candle/{instkey}/{strategy['interval']}/{end_date}/{start_date}"
         
-        for attempt in range(max_retries):
-            try:
-                resp = requests.get(url, headers=headers, timeout=30)
-                
-                if resp.status_code == 429:  # Rate limit
-                    if debug:
-                        print(f"    Rate limited, waiting {2 ** attempt}s")
-                    time.sleep(2 ** attempt)
-                    continue
-                    
-                if resp.status_code != 200:
-                    if debug and attempt == max_retries - 1:
-                        print(f"    HTTP error: {resp.status_code}")
-                    continue
-                    
-                rjson = resp.json()
-                
-                if rjson.get("status") != "success":
-                    if debug and attempt == max_retries - 1:
-                        print(f"    API error: {rjson.get('status')}")
-                    continue
-                
-                candles = rjson.get("data", {}).get("candles", [])
-                if candles:
-                    # Get the latest closing price (most recent candle)
-                    candles.sort(key=datesort, reverse=True)  # Sort by date, newest first
-                    latest_price = float(candles[0][4])  # Closing price
-                    
-                    if debug:
-                        print(f"    Success: ₹{latest_price:.2f} using {strategy['description']}")
-                    
-                    return latest_price
-                else:
-                    if debug and attempt == max_retries - 1:
-                        print(f"    No candle data available")
-                
-            except requests.exceptions.RequestException as e:
-                if debug and attempt == max_retries - 1:
-                    print(f"    Request error: {e}")
-                time.sleep(2 ** attempt)
-            except Exception as e:
-                if debug and attempt == max_retries - 1:
-                    print(f"    Unexpected error: {e}")
+        candles = get_bars(instkey, 'day', start_date, end_date, max_retries, report_errors=debug,
+                           allow_stale=allow_stale)
+        latest_price = latest_close(candles) if candles is not None else None
         
-        # Small delay between strategies to avoid rate limiting
-        time.sleep(0.5)
+        if latest_price is not None:
+            if debug:
+                print(f"    Success: ₹{latest_price:.2f} using {strategy['description']}")
+            
+            return latest_price
+        elif debug:
+            print(f"    No candle data available")
     
     # All strategies failed
     if debug:
@@ -627,18 +718,21 @@ def get_current_price(instkey: str, max_retries: int = 3, debug: bool = False) -
     return None
 
 
-def calculate_portfolio_value(portfolio: pd.DataFrame, nse200_df: pd.DataFrame) -> float:
+def calculate_portfolio_value(portfolio: 'pd.DataFrame', universe: UniverseIndex,
+                              prices: Optional[PriceSnapshot] = None) -> float:
     """
     Calculate current portfolio value
     
     Args:
         portfolio: Current portfolio DataFrame
-        nse200_df: NSE200 data with instrument keys
+        universe: NSE 200 universe index (a DataFrame is also accepted)
+        prices: Run-scoped price snapshot (fetched live if None or missing)
         
     Returns:
         Total portfolio value
     """
     total_value = 0.0
+    universe = UniverseIndex.coerce(universe)
     
     for _, row in portfolio.iterrows():
         symbol = row['Symbol']
@@ -646,15 +740,17 @@ def calculate_portfolio_value(portfolio: pd.DataFrame, nse200_df: pd.DataFrame)
         
         if units == 0:
             continue
-            
+        
         # Find instrument key for this symbol
-        nse_row = nse200_df[nse200_df['Symbol'] == symbol]
-        if nse_row.empty:
+        instkey = universe.instrument_key(symbol)
+        if instkey is None:
             print(f"Warning: {symbol} not found in NSE200 data")
             continue
-            
-        instkey = nse_row.iloc[0]['instrument_key']
-        current_price = get_current_price(instkey)
+        
+        if prices is not None and symbol in prices:
+            current_price = prices.get(symbol)
+        else:
+            current_price = get_current_price(instkey)
         
         if current_price is not None:
             total_value += units * current_price
@@ -664,7 +760,8 @@ def calculate_portfolio_value(portfolio: pd.DataFrame, nse200_df: pd.DataFrame)
     return total_value
 
 
-def calculate_units_to_buy(symbol: str, instkey: str, allocation_amount: float, use_fallback: bool = True, debug: bool = False) -> Tuple[int, float]:
+def calculate_units_to_buy(symbol: str, instkey: str, allocation_amount: float, use_fallback: bool = True, debug: bool = False,
+                           prices: Optional[PriceSnapshot] = None) -> Tuple[int, float]:
     """
     Calculate how many units to buy with given allocation and return the price used
     
@@ -674,6 +771,7 @@ def calculate_units_to_buy(symbol: str, instkey: str, allocation_amount: float,
         allocation_amount: Amount to allocate for this stock
         use_fallback: Use fallback price estimation if API fails
         debug: Enable debug output
+        prices: Run-scoped price snapshot (fetched live if None or missing)
         
     Returns:
         Tuple of (units_to_buy, price_used)
@@ -681,7 +779,10 @@ def calculate_units_to_buy(symbol: str, instkey: str, allocation_amount: float,
     if debug:
         print(f"  Attempting to get price for {symbol} ({instkey})")
     
-    current_price = get_current_price(instkey, debug=debug)
+    if prices is not None and symbol in prices:
+        current_price = prices.get(symbol)
+    else:
+        current_price = get_current_price(instkey, debug=debug)
     
     if current_price is None and use_fallback:
         if debug:
@@ -754,15 +855,17 @@ def estimate_price_from_returns(symbol: str, instkey: str, weeks: int = 4) -> Op
         return None
 
 
-def redistribute_remaining_cash(df: pd.DataFrame, nse200_df: pd.DataFrame, remaining_cash: float, min_cash_threshold: float = 1000) -> Tuple[pd.DataFrame, float]:
+def redistribute_remaining_cash(df: 'pd.DataFrame', universe: UniverseIndex, remaining_cash: float, min_cash_threshold: float = 1000,
+                                prices: Optional[PriceSnapshot] = None) -> Tuple['pd.DataFrame', float]:
     """
     Redistribute remaining cash among existing stock positions to minimize leftover cash
     
     Args:
         df: Current portfolio DataFrame
-        nse200_df: NSE200 data with instrument keys
+        universe: NSE 200 universe index (a DataFrame is also accepted)
         remaining_cash: Amount of cash to redistribute
         min_cash_threshold: Minimum cash to keep (default: ₹1000)
+        prices: Run-scoped price snapshot (fetched live if None or missing)
         
     Returns:
         Tuple of (updated_df, final_remaining_cash)
@@ -779,15 +882,18 @@ def redistribute_remaining_cash(df: pd.DataFrame, nse200_df: pd.DataFrame, remai
         return df, remaining_cash
     
     # Create list of (symbol, price, instkey) for stocks that we can buy more of
+    universe = UniverseIndex.coerce(universe)
     buyable_stocks = []
     for _, row in stock_positions.iterrows():
         symbol = row['Symbol']
         
         # Find instrument key
-        nse_row = nse200_df[nse200_df['Symbol'] == symbol]
-        if not nse_row.empty:
-            instkey = nse_row.iloc[0]['instrument_key']
-            current_price = get_current_price(instkey, debug=False)
+        instkey = universe.instrument_key(symbol)
+        if instkey:
+            if prices is not None and symbol in prices:
+                current_price = prices.get(symbol)
+            else:
+                current_price = get_current_price(instkey, debug=False)
             
             if current_price and current_price <= cash_to_redistribute:
                 buyable_stocks.append({